@@ -1,14 +1,88 @@
 """Custom model admins for the models of the ``task_list`` app."""
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.utils.translation import ugettext_lazy as _
 
 from .models import (
+    ArchivedTask,
     Category,
     Parent,
     Task,
     TaskAttachment,
     TaskList,
 )
+from .pagination import EstimatedCountPaginator
+from .search import get_search_backend
+
+
+class EstimatedCountChangeList(ChangeList):
+    """
+    ChangeList, that does not count the whole table for filtered results.
+
+    Django 1.5 counts all rows of the table for the "x total" link of
+    filtered or searched changelists. This changelist takes that number from
+    the paginator of the unfiltered queryset instead, which estimates it for
+    very large tables, see ``EstimatedCountPaginator``. The filtered results
+    themselves are still counted exactly.
+
+    """
+    def get_results(self, request):
+        root_query_set = self.root_query_set
+        paginator = self.model_admin.get_paginator(
+            request, root_query_set, self.list_per_page)
+        self.root_query_set = root_query_set._clone()
+        self.root_query_set.count = lambda: paginator.count
+        try:
+            super(EstimatedCountChangeList, self).get_results(request)
+        finally:
+            self.root_query_set = root_query_set
+
+
+class SearchChangeList(EstimatedCountChangeList):
+    """
+    ChangeList, that lets the model admin search the results.
+
+    Django 1.5 searches the ``search_fields`` itself. This changelist calls
+    ``get_search_results(request, queryset, search_term)`` of the model admin
+    instead, just like newer Django versions do.
+
+    """
+    def get_query_set(self, request):
+        search_fields = self.search_fields
+        self.search_fields = ()
+        try:
+            qs = super(SearchChangeList, self).get_query_set(request)
+        finally:
+            self.search_fields = search_fields
+        qs, use_distinct = self.model_admin.get_search_results(
+            request, qs, self.query)
+        if use_distinct:
+            return qs.distinct()
+        return qs
+
+
+class ChangeListMixin(object):
+    """
+    Mixin to keep the number of changelist queries independent of the rows.
+
+    The related objects in ``list_select_related_fields`` are joined by the
+    changelist query. Django 1.5 only accepts True for
+    ``list_select_related``, which does not follow nullable foreign keys.
+    The count of very large tables is estimated, see
+    ``EstimatedCountChangeList``.
+
+    """
+    list_select_related_fields = ()
+    paginator = EstimatedCountPaginator
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
+
+    def queryset(self, request):
+        qs = super(ChangeListMixin, self).queryset(request)
+        if self.list_select_related_fields:
+            qs = qs.select_related(*self.list_select_related_fields)
+        return qs
 
 
 class TitleMixin(object):
@@ -23,39 +97,65 @@ class TitleMixin(object):
     category_title.short_description = _('Category title')
 
 
-class CategoryAdmin(admin.ModelAdmin):
+class ArchivedTaskAdmin(ChangeListMixin, TitleMixin, admin.ModelAdmin):
+    """Custom admin for the ``ArchivedTask`` model."""
+    list_display = ('title', 'task_list_title', 'is_done', 'archived')
+    list_select_related_fields = ('task_list',)
+    search_fields = ['title']
+
+
+class CategoryAdmin(ChangeListMixin, admin.ModelAdmin):
     """Custom admin for the ``Category`` model."""
     list_display = ('title',)
     search_fields = ['title']
 
 
-class ParentAdmin(TitleMixin, admin.ModelAdmin):
+class ParentAdmin(ChangeListMixin, TitleMixin, admin.ModelAdmin):
     """Custom admin for the ``Parent`` model."""
     list_display = ('task_list_title', )
+    list_select_related_fields = ('task_list',)
+
 
+class TaskAdmin(ChangeListMixin, TitleMixin, admin.ModelAdmin):
+    """
+    Custom admin for the ``Task`` model.
 
-class TaskAdmin(TitleMixin, admin.ModelAdmin):
-    """Custom admin for the ``Task`` model."""
+    The ``search_fields`` only enable the search box, the search itself is
+    done by the search backend.
+
+    """
     list_display = ('title', 'task_list_title', 'category_title', 'is_done')
+    list_select_related_fields = ('task_list', 'category')
     search_fields = ['title', 'description', 'category__title',
                      'task_list__title']
 
+    def get_changelist(self, request, **kwargs):
+        return SearchChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """Returns the tasks matching the term and if they need distinct."""
+        if not search_term:
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+
 
-class TaskAttachmentAdmin(admin.ModelAdmin):
+class TaskAttachmentAdmin(ChangeListMixin, admin.ModelAdmin):
     """Custom admin for the ``TaskAttachment`` model."""
     list_display = ('task_title',)
+    list_select_related_fields = ('task',)
 
     def task_title(self, obj):
         return obj.task.title
     task_title.short_description = _('Task title')
 
 
-class TaskListAdmin(admin.ModelAdmin):
+class TaskListAdmin(ChangeListMixin, admin.ModelAdmin):
     """Custom admin for the ``TaskList`` model."""
-    list_display = ('title', 'is_template')
+    list_display = ('title', 'is_template', 'get_progress')
     search_fields = ['title']
 
 
+admin.site.register(ArchivedTask, ArchivedTaskAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Parent, ParentAdmin)
 admin.site.register(Task, TaskAdmin)
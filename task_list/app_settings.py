@@ -0,0 +1,32 @@
+"""Default settings for the ``task_list`` app."""
+from django.conf import settings
+
+
+ACCESS_CACHE_TIMEOUT = getattr(settings, 'TASK_LIST_ACCESS_CACHE_TIMEOUT', 60)
+
+AUTOCOMPLETE_LIMIT = getattr(settings, 'TASK_LIST_AUTOCOMPLETE_LIMIT', 20)
+
+CACHE_TIMEOUT = getattr(settings, 'TASK_LIST_CACHE_TIMEOUT', 60 * 60)
+
+ESTIMATED_COUNT_THRESHOLD = getattr(
+    settings, 'TASK_LIST_ESTIMATED_COUNT_THRESHOLD', None)
+
+METRICS_PREFIX = getattr(settings, 'TASK_LIST_METRICS_PREFIX', 'task_list')
+
+METRICS_SINK = getattr(settings, 'TASK_LIST_METRICS_SINK', None)
+
+METRICS_STATSD_ADDRESS = getattr(
+    settings, 'TASK_LIST_METRICS_STATSD_ADDRESS', ('127.0.0.1', 8125))
+
+PAGINATE_BY = getattr(settings, 'TASK_LIST_PAGINATE_BY', 100)
+
+PERMISSION_CACHE_TIMEOUT = getattr(
+    settings, 'TASK_LIST_PERMISSION_CACHE_TIMEOUT', 60)
+
+PERMISSION_RESOLVER = getattr(
+    settings, 'TASK_LIST_PERMISSION_RESOLVER',
+    'task_list.permissions.default_permission_resolver')
+
+SEARCH_BACKEND = getattr(
+    settings, 'TASK_LIST_SEARCH_BACKEND',
+    'task_list.search.DatabaseSearchBackend')
@@ -2,10 +2,14 @@
 from django import forms
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse, reverse_lazy
+from django.db import IntegrityError, transaction
 from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 
 from .models import Parent, Task, TaskList
+from .utils import add_m2m_if_missing, bump_task_list_generation
+from .widgets import UserAutocompleteWidget
 
 
 # ======
@@ -22,12 +26,10 @@ class TaskFormMixin(object):
 
     def save(self, *args, **kwargs):
         instance = super(TaskFormMixin, self).save(*args, **kwargs)
-        if hasattr(instance, 'users'):
-            user_list = instance.users
-        else:
-            user_list = instance.assigned_to
-        if not self.user in user_list.all():
-            user_list.add(self.user)
+        # the user is added with one query, if it is not a member already
+        add_m2m_if_missing(
+            instance, 'users' if isinstance(instance, TaskList)
+            else 'assigned_to', self.user)
         return instance
 
 
@@ -54,19 +56,89 @@ class TaskCreateForm(TaskFormMixin, forms.ModelForm):
         return instance
 
 
+class TaskBulkDoneToggleForm(forms.Form):
+    """Form to mark many tasks as done or undone at once."""
+    tasks = forms.ModelMultipleChoiceField(
+        queryset=None,
+    )
+
+    is_done = forms.BooleanField(
+        required=False,
+    )
+
+    def __init__(self, user, *args, **kwargs):
+        super(TaskBulkDoneToggleForm, self).__init__(*args, **kwargs)
+        # the submitted tasks are validated with one query against the lists
+        # the user is a member of, templates cannot be toggled
+        self.fields['tasks'].queryset = Task.objects.filter(
+            task_list__users=user, task_list__is_template=False)
+
+    def save(self):
+        """
+        Toggles the tasks and returns the number of tasks, that were changed.
+
+        The tasks, that are not in the new state already, are selected and
+        locked first and then updated with one UPDATE, so that the task
+        counters of each list are changed by the number of its updated rows.
+
+        """
+        is_done = now() if self.cleaned_data.get('is_done') else None
+        task_pks = [task.pk for task in self.cleaned_data.get('tasks')]
+        counts = {}
+        with transaction.commit_on_success():
+            rows = list(Task.objects.select_for_update().filter(
+                pk__in=task_pks, is_done__isnull=is_done is not None,
+            ).order_by().values_list('pk', 'task_list'))
+            if rows:
+                Task.objects.filter(pk__in=[row[0] for row in rows]).update(
+                    is_done=is_done)
+            for task_pk, task_list_pk in rows:
+                counts[task_list_pk] = counts.get(task_list_pk, 0) + 1
+            for task_list_pk, count in counts.items():
+                TaskList.objects.add_to_counts(
+                    task_list_pk, done_count=count if is_done else -count)
+        # updates don't send signals, so we invalidate the lists ourselves,
+        # after the transaction, so that no old rows are cached for the new
+        # generation
+        bump_task_list_generation(counts.keys())
+        return len(rows)
+
+
 class TaskDoneToggleForm(forms.Form):
     """Form to toggle a tasks done status."""
     task = forms.ModelChoiceField(
-        queryset=Task.objects.all(),
+        queryset=None,
     )
 
+    def __init__(self, task_list, *args, **kwargs):
+        super(TaskDoneToggleForm, self).__init__(*args, **kwargs)
+        self.fields['task'].queryset = Task.objects.filter(
+            task_list=task_list)
+
     def save(self):
         task = self.cleaned_data.get('task')
-        if task.is_done:
-            task.is_done = None
+        is_done = None if task.is_done else now()
+        # only the state we have read is flipped and only the is_done column
+        # is written, so that concurrent requests don't overwrite each other
+        updated = Task.objects.filter(
+            pk=task.pk, is_done__isnull=task.is_done is None).update(
+            is_done=is_done)
+        if updated:
+            task.is_done = is_done
+            bump_task_list_generation([task.task_list_id])
+            TaskList.objects.add_to_counts(
+                task.task_list_id, done_count=1 if is_done else -1)
+            # the counters include the new state now, so saving the task
+            # later must not count it again
+            task._counted_state = (task.task_list_id, bool(is_done))
         else:
-            task.is_done = now()
-        task.save()
+            # another request has toggled the task and counted its state or
+            # has deleted the task, then there is nothing left to toggle
+            values = list(Task.objects.filter(pk=task.pk).values_list(
+                'is_done', flat=True))
+            if values:
+                task.is_done = values[0]
+                task._counted_state = (task.task_list_id, bool(task.is_done))
         return task
 
 
@@ -109,10 +181,20 @@ class TaskListCreateForm(TaskFormMixin, forms.ModelForm):
 
 
 class TaskListUpdateForm(TaskFormMixin, forms.ModelForm):
-    """ModelForm to update an instance of the ``TaskList`` model."""
+    """
+    ModelForm to update an instance of the ``TaskList`` model.
+
+    Any user can be added to the list. The autocomplete only finds users, who
+    share no list with the current user, by their full username.
+
+    """
     class Meta:
         model = TaskList
         fields = ('title', 'users')
+        widgets = {
+            'users': UserAutocompleteWidget(
+                url=reverse_lazy('task_list_api_users')),
+        }
 
 
 class TaskUpdateForm(TaskFormMixin, forms.ModelForm):
@@ -125,8 +207,13 @@ class TaskUpdateForm(TaskFormMixin, forms.ModelForm):
     def __init__(self, user, task_list, *args, **kwargs):
         self.task_list = task_list
         super(TaskUpdateForm, self).__init__(user, *args, **kwargs)
+        # the submitted users are validated with one query against the
+        # members of the list
         self.fields['assigned_to'].queryset = User.objects.filter(
-            pk__in=[list_user.pk for list_user in self.task_list.users.all()])
+            task_lists=self.task_list)
+        self.fields['assigned_to'].widget = UserAutocompleteWidget(
+            url=reverse('task_list_api_users', kwargs={
+                'task_list_pk': self.task_list.pk}))
 
     def save(self, *args, **kwargs):
         self.instance.task_list = self.task_list
@@ -135,27 +222,48 @@ class TaskUpdateForm(TaskFormMixin, forms.ModelForm):
 
 class TemplateForm(TaskFormMixin, forms.ModelForm):
     """Form to manage ``TaskList`` instances, that are marked as template."""
+    duplicate_title_error = _(
+        'You have already created a template with this name.')
+
     class Meta:
         model = TaskList
         fields = ('title',)
 
+    def get_template_owner_pk(self):
+        """Returns the id of the user, who owns the saved template."""
+        if self.instance.is_template and self.instance.template_owner_id:
+            return self.instance.template_owner_id
+        return self.user.pk
+
     def clean_title(self):
-        data = self.data.get('title')
-        if data:
-            try:
-                matching_list = TaskList.objects.get(
-                    users=self.user, is_template=True, title=data)
-            except:
-                pass
-            else:
-                if not self.instance.pk == matching_list.pk:
-                    raise forms.ValidationError(_(
-                        'You have already created a template with this name.'))
-        return data
+        title = self.cleaned_data.get('title')
+        # answered by the unique index on the owner and title
+        if title and TaskList.objects.filter(
+                template_owner=self.get_template_owner_pk(),
+                title=title).exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError(self.duplicate_title_error)
+        return title
 
     def save(self, *args, **kwargs):
-        # if the instance is a template already, we just update it
-        if self.instance.is_template:
-            return super(TemplateForm, self).save(*args, **kwargs)
-        return TaskList.objects.create_template_from_task_list(self.instance,
-                                                               self.user)
+        """
+        Returns the saved template or None, if the owner saved another
+        template with the same title after this form was validated. In that
+        case, the error is added to the form.
+
+        """
+        try:
+            # if the instance is a template already, we just update it
+            if self.instance.is_template:
+                self.instance.template_owner_id = self.get_template_owner_pk()
+                sid = transaction.savepoint()
+                instance = super(TemplateForm, self).save(*args, **kwargs)
+                transaction.savepoint_commit(sid)
+                return instance
+            return TaskList.objects.create_template_from_task_list(
+                self.instance, self.user)
+        except IntegrityError:
+            if self.instance.is_template:
+                transaction.savepoint_rollback(sid)
+            self._errors['title'] = self.error_class([
+                self.duplicate_title_error])
+            return None
@@ -0,0 +1,223 @@
+"""
+Optional instrumentation of the views of the ``task_list`` app.
+
+Add ``task_list.instrumentation.InstrumentationMiddleware`` to your
+``MIDDLEWARE_CLASSES`` and set ``TASK_LIST_METRICS_SINK`` to the sink, that
+should receive the metrics. Without a sink the middleware removes itself, so
+that it costs nothing.
+
+For every request to a view of the app the middleware publishes:
+
+:queries: The number of SQL queries.
+:sql_time: The seconds spent in these queries.
+:render_time: The seconds spent rendering the template of the response.
+:login_required_time: The seconds spent in the content object permission
+  check of ``LoginRequiredMixin``.
+:permission_time: The seconds spent loading the object and checking the
+  membership in ``PermissionMixin`` and ``TaskListView``.
+:total_time: The seconds from calling the view to the end of the response.
+
+"""
+import logging
+import socket
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.utils.importlib import import_module
+
+from . import app_settings
+
+
+logger = logging.getLogger('task_list.metrics')
+
+
+@contextmanager
+def record_time(request, name):
+    """
+    Adds the seconds spent in the block to the metric of the request.
+
+    Does nothing, if the request is not instrumented.
+
+    """
+    metrics = getattr(request, '_task_list_metrics', None)
+    if metrics is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        metrics[name] = metrics.get(name, 0) + time.time() - start
+
+
+class BaseMetricsSink(object):
+    """Base class of all metrics sinks."""
+    def publish(self, view_name, metrics):
+        """
+        Publishes the metrics of one request.
+
+        :view_name: The dotted path of the view class, e.g.
+          ``task_list.views.TaskListView``.
+        :metrics: A dictionary of the metric names and their values.
+
+        """
+        raise NotImplementedError
+
+
+class LoggingSink(BaseMetricsSink):
+    """Logs the metrics to the ``task_list.metrics`` logger."""
+    def publish(self, view_name, metrics):
+        logger.info('%s %s', view_name, ' '.join([
+            '{0}={1}'.format(name, metrics[name])
+            for name in sorted(metrics)]))
+
+
+class MemorySink(BaseMetricsSink):
+    """
+    Keeps the metrics of the last requests in ``MemorySink.records``.
+
+    Useful in tests and in the shell. The records are ``(view_name,
+    metrics)`` tuples and shared by all instances of the sink.
+
+    """
+    records = deque(maxlen=1000)
+
+    def publish(self, view_name, metrics):
+        self.records.append((view_name, metrics))
+
+    @classmethod
+    def clear(cls):
+        cls.records.clear()
+
+
+class StatsdSink(BaseMetricsSink):
+    """
+    Sends the metrics to a statsd compatible listener over UDP.
+
+    All metrics of a request are sent in one datagram. The query count is
+    sent as a counter next to a ``requests`` counter, the times are sent as
+    timers in milliseconds. Errors are ignored, so that the listener can be
+    missing.
+
+    """
+    def __init__(self):
+        self.address = tuple(app_settings.METRICS_STATSD_ADDRESS)
+        self.prefix = app_settings.METRICS_PREFIX
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def format(self, view_name, metrics):
+        """Returns the datagram for the given metrics."""
+        prefix = '{0}.{1}'.format(self.prefix, view_name.rsplit('.', 1)[-1])
+        lines = ['{0}.requests:1|c'.format(prefix)]
+        for name in sorted(metrics):
+            if name == 'queries':
+                lines.append('{0}.queries:{1}|c'.format(prefix, metrics[name]))
+            else:
+                lines.append('{0}.{1}:{2:.3f}|ms'.format(
+                    prefix, name, metrics[name] * 1000))
+        return '\n'.join(lines)
+
+    def publish(self, view_name, metrics):
+        try:
+            self.socket.sendto(
+                self.format(view_name, metrics).encode('utf-8'), self.address)
+        except socket.error:
+            pass
+
+
+def get_metrics_sink():
+    """
+    Returns an instance of the sink in ``TASK_LIST_METRICS_SINK`` or None,
+    if no sink is set.
+
+    """
+    if not app_settings.METRICS_SINK:
+        return None
+    module_name, attr = app_settings.METRICS_SINK.rsplit('.', 1)
+    try:
+        sink_class = getattr(import_module(module_name), attr)
+    except (ImportError, AttributeError):
+        raise ImproperlyConfigured(
+            'TASK_LIST_METRICS_SINK "{0}" cannot be imported.'.format(
+                app_settings.METRICS_SINK))
+    return sink_class()
+
+
+class InstrumentationMiddleware(object):
+    """
+    Measures the views of the ``task_list`` app and publishes the metrics to
+    the sink in ``TASK_LIST_METRICS_SINK``.
+
+    The queries are counted by turning on the debug cursor of every
+    connection, while an instrumented view runs. Streaming responses are
+    published, when the server closes them after sending their content.
+
+    """
+    def __init__(self):
+        self.sink = get_metrics_sink()
+        if self.sink is None:
+            raise MiddlewareNotUsed
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        module = getattr(view_func, '__module__', None)
+        if module != 'task_list.views':
+            return None
+        request._task_list_metrics = {}
+        request._task_list_instrumentation = {
+            'view_name': '{0}.{1}'.format(
+                module, getattr(view_func, '__name__', 'view')),
+            'start': time.time(),
+            'connections': [
+                (connection, connection.use_debug_cursor,
+                 len(connection.queries))
+                for connection in connections.all()],
+        }
+        for connection in connections.all():
+            connection.use_debug_cursor = True
+        return None
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, '_task_list_metrics', None)
+        if metrics is not None:
+            start = time.time()
+
+            def set_render_time(response):
+                metrics['render_time'] = time.time() - start
+            response.add_post_render_callback(set_render_time)
+        return response
+
+    def process_response(self, request, response):
+        if getattr(request, '_task_list_instrumentation', None) is None:
+            return response
+        if not response.streaming:
+            self.publish(request)
+            return response
+        # the content of streaming responses is only created, when the server
+        # sends it, so we publish, when the server closes the response
+        close = response.close
+
+        def publish_and_close():
+            if getattr(request, '_task_list_instrumentation', None):
+                self.publish(request)
+            close()
+        response.close = publish_and_close
+        return response
+
+    def publish(self, request):
+        """Collects the metrics of the request and sends them to the sink."""
+        state = request._task_list_instrumentation
+        request._task_list_instrumentation = None
+        metrics = request._task_list_metrics
+        metrics['total_time'] = time.time() - state['start']
+        metrics['queries'] = 0
+        metrics['sql_time'] = 0
+        for connection, use_debug_cursor, offset in state['connections']:
+            queries = connection.queries[offset:]
+            metrics['queries'] += len(queries)
+            metrics['sql_time'] += sum([
+                float(query['time']) for query in queries])
+            connection.use_debug_cursor = use_debug_cursor
+        self.sink.publish(state['view_name'], metrics)
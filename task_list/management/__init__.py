@@ -0,0 +1,12 @@
+"""Creates the search index of the ``task_list`` app after ``syncdb``."""
+from django.db.models.signals import post_syncdb
+from django.dispatch import receiver
+
+from .. import models as task_list_app
+from ..search import get_search_backend
+
+
+@receiver(post_syncdb, sender=task_list_app)
+def search_index_installed(sender, db, **kwargs):
+    """Creates the search index, when the tables of the app are created."""
+    get_search_backend().install(using=db)
@@ -0,0 +1,56 @@
+"""Moves tasks, that were done a long time ago, to the archive."""
+from datetime import timedelta
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+
+from ...models import ArchivedTask, Task
+
+
+class Command(BaseCommand):
+    """
+    Moves the tasks, that were done more than ``--days`` days ago, with their
+    assignments and attachments to ``ArchivedTask``.
+
+    The tasks are moved in chunks ordered by their ids, each in its own
+    transaction, so that the command never locks the task table for long.
+
+    """
+    help = 'Moves tasks, that were done a long time ago, to the archive.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--days',
+            type='int',
+            dest='days',
+            default=365,
+            help='Archive the tasks, that were done more than this many days'
+                 ' ago.'),
+        make_option(
+            '--chunk-size',
+            type='int',
+            dest='chunk_size',
+            default=1000,
+            help='The number of tasks moved in one transaction.'),
+    )
+
+    def handle(self, *args, **options):
+        if options.get('days') < 0 or options.get('chunk_size') < 1:
+            raise CommandError(
+                'The days must not be negative and the chunk size positive.')
+        chunk_size = options.get('chunk_size')
+        done_before = now().date() - timedelta(days=options.get('days'))
+        tasks = Task.objects.filter(is_done__lt=done_before).order_by('pk')
+        archive_tasks = transaction.commit_on_success(
+            ArchivedTask.objects.archive_tasks)
+        last_pk = 0
+        archived = 0
+        while True:
+            pks = list(tasks.filter(pk__gt=last_pk).values_list(
+                'pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            archived += archive_tasks(pks, done_before)
+            last_pk = pks[-1]
+        self.stdout.write('Archived {0} tasks.'.format(archived))
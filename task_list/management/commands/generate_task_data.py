@@ -0,0 +1,250 @@
+"""Generates a large synthetic dataset to reproduce performance problems."""
+import random
+from bisect import bisect
+from datetime import timedelta
+from itertools import islice
+from optparse import make_option
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, get_model
+from django.utils.timezone import now
+
+from ...constants import PRIORITY_CHOICES
+from ...models import Category, Parent, Task, TaskList
+from ...search import get_search_backend
+
+
+VERBS = ['Book', 'Buy', 'Call', 'Check', 'Clean', 'Order', 'Pay', 'Plan',
+         'Prepare', 'Print', 'Send', 'Sign', 'Update', 'Write']
+
+NOUNS = ['band', 'budget', 'cake', 'catering', 'contract', 'decoration',
+         'dress', 'flowers', 'guest list', 'invitations', 'menu', 'music',
+         'photographer', 'rings', 'seating plan', 'venue']
+
+# the middle priority is picked most often
+PRIORITY_WEIGHTS = [1, 2, 6, 2, 1]
+
+
+class Command(BaseCommand):
+    """
+    Creates users, categories, task lists, templates, tasks and ``Parent``
+    bindings with chunked bulk inserts.
+
+    The members of the lists and the number of tasks per list follow long
+    tailed distributions, so that a few users and lists are much larger
+    than the rest, like in a real install. The same options and seed always
+    create the same data, only the ids depend on the rows, that exist
+    already, and the dates are relative to today.
+
+    The ids of the inserted rows are read back by their range, so no other
+    process should write to these tables while the command runs.
+
+    """
+    help = 'Generates a large synthetic dataset of task lists and tasks.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--users', type='int', dest='users', default=100,
+            help='The number of users to create.'),
+        make_option(
+            '--categories', type='int', dest='categories', default=20,
+            help='The number of categories to create.'),
+        make_option(
+            '--lists', type='int', dest='lists', default=1000,
+            help='The number of task lists to create.'),
+        make_option(
+            '--templates', type='int', dest='templates', default=50,
+            help='The number of templates to create.'),
+        make_option(
+            '--tasks', type='int', dest='tasks', default=100000,
+            help='The number of tasks to distribute over all lists.'),
+        make_option(
+            '--host-model', dest='host_model', default='auth.User',
+            help='The model of the objects, that lists are bound to.'),
+        make_option(
+            '--bound-ratio', type='float', dest='bound_ratio', default=0.5,
+            help='The share of lists, that are bound to an object.'),
+        make_option(
+            '--seed', type='int', dest='seed', default=0,
+            help='The seed of the random generator.'),
+        make_option(
+            '--chunk-size', type='int', dest='chunk_size', default=1000,
+            help='The number of rows inserted in one transaction.'),
+    )
+
+    def handle(self, *args, **options):
+        if options.get('users') < 1 or options.get('lists') < 1:
+            raise CommandError('At least one user and list are needed.')
+        host_model = get_model(*options.get('host_model').split('.'))
+        if host_model is None:
+            raise CommandError('Unknown model "{0}".'.format(
+                options.get('host_model')))
+        self.random = random.Random(options.get('seed'))
+        self.chunk_size = options.get('chunk_size')
+        self.today = now().date()
+
+        user_pks = self.create_users(options.get('users'))
+        category_pks = self.create_categories(options.get('categories'))
+        host_pks = list(host_model.objects.order_by('pk').values_list(
+            'pk', flat=True))
+        task_lists = self.create_task_lists(
+            options.get('lists'), options.get('templates'),
+            options.get('tasks'), user_pks, host_model, host_pks,
+            options.get('bound_ratio'))
+        self.create_tasks(task_lists, category_pks)
+        transaction.commit_on_success(get_search_backend().rebuild)()
+        self.stdout.write(
+            'Created {0} users, {1} categories, {2} task lists, {3} templates'
+            ' and {4} tasks.'.format(
+                len(user_pks), len(category_pks), options.get('lists'),
+                options.get('templates'), options.get('tasks')))
+
+    def insert(self, model, objs):
+        """Inserts the objects in chunks of one transaction each."""
+        objs = iter(objs)
+        while True:
+            chunk = list(islice(objs, self.chunk_size))
+            if not chunk:
+                break
+            transaction.commit_on_success(model.objects.bulk_create)(chunk)
+
+    def bulk_create(self, model, objs):
+        """
+        Inserts the objects and returns the ids of the new rows in the order
+        of the objects.
+
+        """
+        last_pk = model.objects.aggregate(Max('pk'))['pk__max'] or 0
+        self.insert(model, objs)
+        return list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True))
+
+    def get_weighted_choice(self, weights):
+        """Returns a function, that picks an index by the given weights."""
+        totals = []
+        total = 0
+        for weight in weights:
+            total += weight
+            totals.append(total)
+        return lambda: bisect(totals, self.random.random() * total)
+
+    def get_title(self):
+        return '{0} {1}'.format(
+            self.random.choice(VERBS), self.random.choice(NOUNS))
+
+    def create_users(self, count):
+        offset = User.objects.filter(username__startswith='synthetic').count()
+        return self.bulk_create(User, (
+            User(username='synthetic{0}'.format(offset + index),
+                 email='synthetic{0}@example.com'.format(offset + index),
+                 password=UNUSABLE_PASSWORD)
+            for index in range(count)))
+
+    def create_categories(self, count):
+        return self.bulk_create(Category, (
+            Category(title=self.random.choice(NOUNS).capitalize())
+            for index in range(count)))
+
+    def create_task_lists(self, count, template_count, task_count, user_pks,
+                          host_model, host_pks, bound_ratio):
+        """
+        Creates the lists, their members and their bindings.
+
+        Returns a list of ``(pk, is_template, member_pks, task_count,
+        done_count)`` tuples, so that the counters of the lists can be stored
+        right away.
+
+        """
+        # a few users are members of most lists
+        pick_user = self.get_weighted_choice([
+            self.random.paretovariate(1.16) for pk in user_pks])
+        ctype = ContentType.objects.get_for_model(host_model)
+        rows = []
+        objs = []
+        for index in range(count + template_count):
+            is_template = index >= count
+            member_pks = sorted(set(
+                user_pks[pick_user()] for member in range(
+                    1 + int(self.random.expovariate(0.7)))))
+            task_list = TaskList(title=self.get_title(),
+                                 is_template=is_template)
+            if is_template:
+                # the titles of the templates of one owner must be unique
+                task_list.title = 'Template {0}'.format(index - count)
+                task_list.template_owner_id = member_pks[0]
+            elif host_pks and self.random.random() < bound_ratio:
+                task_list.content_type = ctype
+                task_list.object_id = self.random.choice(host_pks)
+            objs.append(task_list)
+            rows.append([is_template, member_pks])
+
+        # most lists are small, but some have thousands of tasks
+        weights = [self.random.paretovariate(1.16) for obj in objs]
+        total = sum(weights)
+        counts = [int(task_count * weight / total) for weight in weights]
+        for index in self.random.sample(
+                range(len(objs)), task_count - sum(counts)):
+            counts[index] += 1
+        for task_list, row, list_task_count in zip(objs, rows, counts):
+            task_list.task_count = list_task_count
+            if not row[0]:
+                task_list.done_count = int(round(
+                    list_task_count * self.random.betavariate(2, 2)))
+            row.extend([task_list.task_count, task_list.done_count])
+
+        pks = self.bulk_create(TaskList, objs)
+        self.insert(TaskList.users.through, (
+            TaskList.users.through(tasklist_id=pk, user_id=user_pk)
+            for pk, row in zip(pks, rows) for user_pk in row[1]))
+        self.insert(Parent, (
+            Parent(task_list_id=pk, content_type_id=task_list.content_type_id,
+                   object_id=task_list.object_id)
+            for pk, task_list in zip(pks, objs) if task_list.object_id))
+        return [[pk] + row for pk, row in zip(pks, rows)]
+
+    def iter_tasks(self, task_lists, category_pks):
+        """
+        Yields the tasks of the given lists and the ids of the users, that
+        each task is assigned to.
+
+        """
+        priorities = [choice[0] for choice in PRIORITY_CHOICES]
+        pick_priority = self.get_weighted_choice(PRIORITY_WEIGHTS)
+        pick_category = self.get_weighted_choice([
+            self.random.paretovariate(1.16) for pk in category_pks])
+        for pk, is_template, member_pks, task_count, done_count in task_lists:
+            for index in range(task_count):
+                task = Task(task_list_id=pk, title=self.get_title(),
+                            priority=priorities[pick_priority()])
+                assigned_to = []
+                if self.random.random() < 0.3:
+                    task.description = 'Remember the {0}.'.format(
+                        self.random.choice(NOUNS))
+                if category_pks and self.random.random() < 0.6:
+                    task.category_id = category_pks[pick_category()]
+                if not is_template:
+                    if index < done_count:
+                        task.is_done = self.today - timedelta(
+                            days=self.random.randint(0, 365))
+                    if self.random.random() < 0.5:
+                        task.due_date = self.today + timedelta(
+                            days=self.random.randint(-60, 120))
+                    if self.random.random() < 0.3:
+                        assigned_to = [self.random.choice(member_pks)]
+                yield task, assigned_to
+
+    def create_tasks(self, task_lists, category_pks):
+        """Creates the tasks and their assignments chunk by chunk."""
+        tasks = self.iter_tasks(task_lists, category_pks)
+        while True:
+            chunk = list(islice(tasks, self.chunk_size))
+            if not chunk:
+                break
+            pks = self.bulk_create(Task, [task for task, users in chunk])
+            self.insert(Task.assigned_to.through, (
+                Task.assigned_to.through(task_id=pk, user_id=user_pk)
+                for pk, (task, users) in zip(pks, chunk)
+                for user_pk in users))
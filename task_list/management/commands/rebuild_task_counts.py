@@ -0,0 +1,71 @@
+"""Rebuilds the task counters of all task lists."""
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from ...models import Task, TaskList
+
+
+class Command(BaseCommand):
+    """
+    Counts the tasks of all lists and fixes the ``task_count`` and
+    ``done_count`` columns, where they differ.
+
+    The lists are processed in chunks ordered by their ids, so that the
+    command neither loads all lists at once nor holds long transactions.
+    Each chunk is counted and fixed in one transaction, that locks its lists.
+
+    """
+    help = 'Rebuilds the task counters of all task lists.'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--chunk-size',
+            type='int',
+            dest='chunk_size',
+            default=1000,
+            help='The number of task lists counted in one transaction.'),
+    )
+
+    def handle(self, *args, **options):
+        chunk_size = options.get('chunk_size')
+        last_pk = 0
+        checked = fixed = 0
+        while True:
+            pks = list(TaskList.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            fixed += self.rebuild_chunk(pks[0], pks[-1])
+            checked += len(pks)
+            last_pk = pks[-1]
+        self.stdout.write('Checked {0} task lists, fixed {1}.'.format(
+            checked, fixed))
+
+    @transaction.commit_on_success
+    def rebuild_chunk(self, first_pk, last_pk):
+        """
+        Fixes the counters of the lists with ids from ``first_pk`` to
+        ``last_pk``.
+
+        The lists are locked, while their tasks are counted, so that the
+        counter updates of concurrent changes wait for the new counters
+        instead of being overwritten by them.
+
+        """
+        counters = list(TaskList.objects.select_for_update().filter(
+            pk__range=(first_pk, last_pk)).order_by('pk').values_list(
+            'pk', 'task_count', 'done_count'))
+        rows = Task.objects.filter(
+            task_list__range=(first_pk, last_pk)).order_by().values_list(
+            'task_list').annotate(Count('pk'), Count('is_done'))
+        counts = dict([(row[0], row[1:]) for row in rows])
+        fixed = 0
+        for pk, task_count, done_count in counters:
+            count = counts.get(pk, (0, 0))
+            if count != (task_count, done_count):
+                TaskList.objects.filter(pk=pk).update(
+                    task_count=count[0], done_count=count[1])
+                fixed += 1
+        return fixed
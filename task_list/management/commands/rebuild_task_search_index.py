@@ -0,0 +1,20 @@
+"""Rebuilds the search index of all tasks."""
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from ...search import get_search_backend
+
+
+class Command(NoArgsCommand):
+    """
+    Creates the index of the search backend, if it does not exist yet, and
+    adds all tasks to it again.
+
+    """
+    help = 'Rebuilds the search index of all tasks.'
+
+    @transaction.commit_on_success
+    def handle_noargs(self, **options):
+        backend = get_search_backend()
+        backend.install()
+        backend.rebuild()
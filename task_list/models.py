@@ -1,13 +1,27 @@
 """Models for the ``task_list`` app."""
 from copy import deepcopy
 
+from django.contrib.auth.models import User
 from django.contrib.contenttypes import generic
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.utils.translation import ugettext_lazy as _
+from django.db import connection, models, transaction
+from django.db.models import Count, F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.db.models.signals import post_init, pre_delete
+from django.dispatch import receiver
+from django.utils.timezone import now
+from django.utils.translation import ugettext, ugettext_lazy as _
 from filer.fields.file import FilerFileField
 
 from .constants import PRIORITY_CHOICES
+from .permissions import invalidate_user_permissions
+from .search import get_search_backend
+from .utils import (
+    bump_task_list_generation,
+    get_cached_accessible_task_lists,
+    invalidate_accessible_task_lists,
+    set_cached_accessible_task_lists,
+)
 
 
 class Category(models.Model):
@@ -122,6 +136,9 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['due_date', 'priority', 'title']
+        # matches the ordering of the tasks of one list, so that the database
+        # does not need to sort them separately
+        index_together = [['task_list', 'due_date', 'priority', 'title']]
 
 
 class TaskAttachment(models.Model):
@@ -150,41 +167,135 @@ class TaskAttachment(models.Model):
 
 class TaskListManager(models.Manager):
     """Custom manager for the ``TaskList`` model."""
+    def _copy_tasks(self, source, target, user_ids=None, reset=False):
+        """
+        Copies all tasks of ``source`` to ``target`` with bulk inserts.
+
+        Assignments are only copied for the users in ``user_ids``, so that no
+        task of ``target`` is assigned to a user, who cannot access it. If
+        ``reset`` is True, the done state and the due date are not copied.
+
+        """
+        tasks = list(source.tasks.order_by('pk'))
+        old_pks = [task.pk for task in tasks]
+        for task in tasks:
+            task.id = None
+            task.task_list = target
+            if reset:
+                task.is_done = None
+                task.due_date = None
+        Task.objects.bulk_create(tasks)
+        # bulk_create does not send signals, so we count and index the tasks
+        # ourselves
+        self.add_to_counts(
+            target, task_count=len(tasks),
+            done_count=len([task for task in tasks if task.is_done]))
+        get_search_backend().update_task_list(target.pk)
+        if not user_ids:
+            return tasks
+        through = Task.assigned_to.through
+        assignments = through.objects.filter(
+            task__task_list=source, user__pk__in=user_ids).values_list(
+            'task_id', 'user_id')
+        if assignments:
+            # bulk_create does not set the primary keys, but the new rows are
+            # inserted in the order of the old ones
+            new_pks = target.tasks.order_by('pk').values_list('pk', flat=True)
+            pk_map = dict(zip(old_pks, new_pks))
+            through.objects.bulk_create([
+                through(task_id=pk_map[task_pk], user_id=user_pk)
+                for task_pk, user_pk in assignments])
+        return tasks
+
+    def add_to_counts(self, task_list, task_count=0, done_count=0):
+        """
+        Adds the given numbers to the task counters of a list.
+
+        The counters are changed with ``F()`` expressions in one UPDATE, so
+        that concurrent changes don't overwrite each other. The counters of
+        the given instance are changed as well.
+
+        """
+        kwargs = {}
+        if task_count:
+            kwargs['task_count'] = F('task_count') + task_count
+        if done_count:
+            kwargs['done_count'] = F('done_count') + done_count
+        if not kwargs:
+            return
+        if isinstance(task_list, TaskList):
+            task_list.task_count += task_count
+            task_list.done_count += done_count
+            task_list = task_list.pk
+        self.filter(pk=task_list).update(**kwargs)
+
+    def get_overdue_counts(self, task_lists, date):
+        """
+        Returns a dict with the number of overdue tasks of each given list.
+
+        Only the open tasks are read, so the query can use the partial index
+        ``task_list_task_open``. Lists without overdue tasks are left out.
+
+        :task_lists: A queryset of the lists to count the tasks of.
+        :date: Open tasks due before this date are overdue.
+
+        """
+        return dict(Task.objects.filter(
+            task_list__in=task_lists, is_done__isnull=True,
+            due_date__lt=date).order_by().values_list('task_list').annotate(
+            Count('pk')))
+
+    def get_accessible_pks(self, user):
+        """
+        Returns the set of ids of all task lists the user can access.
+
+        The set is cached and invalidated, when the memberships of the user
+        change, so that permission checks usually don't hit the database.
+
+        """
+        if not user.pk:
+            return set()
+        task_list_pks = get_cached_accessible_task_lists(user.pk)
+        if task_list_pks is None:
+            task_list_pks = set(self.filter(users__pk=user.pk).values_list(
+                'pk', flat=True))
+            set_cached_accessible_task_lists(user.pk, task_list_pks)
+        return task_list_pks
+
+    @transaction.commit_on_success
     def create_from_template(self, template, new_title, user):
         """Creates a new task list from a template task list."""
         # copy the template
         new_task_list = deepcopy(template)
         new_task_list.id = None
         new_task_list.is_template = False
+        new_task_list.template_owner = None
         new_task_list.title = new_title
+        new_task_list.content_type = None
+        new_task_list.object_id = None
+        new_task_list.task_count = new_task_list.done_count = 0
         new_task_list.save()
         new_task_list.users.add(user)
         # copy all tasks
-        for task in template.tasks.all():
-            new_task = deepcopy(task)
-            new_task.id = None
-            new_task.task_list = new_task_list
-            new_task.save()
+        self._copy_tasks(template, new_task_list, user_ids=[user.pk])
         return new_task_list
 
+    @transaction.commit_on_success
     def create_template_from_task_list(self, task_list, user):
         """Creates a new template task list from an existing task list."""
         # copy the instance
         new_task_list = deepcopy(task_list)
         new_task_list.id = None
         new_task_list.is_template = True
+        new_task_list.template_owner = user
+        new_task_list.content_type = None
+        new_task_list.object_id = None
+        new_task_list.task_count = new_task_list.done_count = 0
         new_task_list.save()
-        # clear users and set the request user only
+        # the copy has no users yet, so we set the request user only
         new_task_list.users.add(user)
-        # copy all tasks
-        for task in task_list.tasks.all():
-            new_task = deepcopy(task)
-            new_task.id = None
-            new_task.is_done = None
-            new_task.due_date = None
-            new_task.task_list = new_task_list
-            new_task.save()
-            new_task.assigned_to.clear()
+        # copy all tasks without their assignments
+        self._copy_tasks(task_list, new_task_list, reset=True)
         return new_task_list
 
 
@@ -196,6 +307,14 @@ class TaskList(models.Model):
     :title: The title of this task list.
     :is_template: True, if the task list is saved as non-editable template that
         can be used to initialize a new list.
+    :template_owner: The user, who saved this list as template. The titles of
+      the templates of one owner are unique. It is None for all other lists.
+    :content_type: A copy of the content type of the ``Parent`` of this list,
+      so that the lists of an object can be found without joining ``Parent``.
+    :object_id: A copy of the object id of the ``Parent`` of this list. It is
+      None, if and only if ``content_type`` is None.
+    :task_count: The number of tasks of this list.
+    :done_count: The number of done tasks of this list.
 
     """
     users = models.ManyToManyField(
@@ -204,6 +323,17 @@ class TaskList(models.Model):
         related_name='task_lists',
     )
 
+    content_type = models.ForeignKey(
+        ContentType,
+        null=True, blank=True,
+        editable=False,
+    )
+
+    object_id = models.PositiveIntegerField(
+        null=True, blank=True,
+        editable=False,
+    )
+
     title = models.CharField(
         verbose_name=_('Title'),
         max_length=256,
@@ -214,6 +344,26 @@ class TaskList(models.Model):
         default=False,
     )
 
+    template_owner = models.ForeignKey(
+        'auth.User',
+        verbose_name=_('Template owner'),
+        related_name='owned_templates',
+        null=True, blank=True,
+        editable=False,
+    )
+
+    task_count = models.PositiveIntegerField(
+        verbose_name=_('Tasks'),
+        default=0,
+        editable=False,
+    )
+
+    done_count = models.PositiveIntegerField(
+        verbose_name=_('Done tasks'),
+        default=0,
+        editable=False,
+    )
+
     objects = TaskListManager()
 
     def __unicode__(self):
@@ -221,3 +371,373 @@ class TaskList(models.Model):
 
     class Meta:
         ordering = ['title']
+        # the lists of one object (or the standalone lists, where both columns
+        # are NULL) are looked up by these columns on every list page
+        index_together = [['object_id', 'content_type', 'is_template']]
+        # NULL owners don't collide, so only the titles of templates are
+        # unique
+        unique_together = [['template_owner', 'title']]
+
+    @property
+    def open_count(self):
+        """Returns the number of tasks, that are not done yet."""
+        return self.task_count - self.done_count
+
+    def get_progress(self):
+        """Returns the progress of this list as text, i.e. "12/40 done"."""
+        return ugettext('%(done)s/%(total)s done') % {
+            'done': self.done_count, 'total': self.task_count}
+    get_progress.short_description = _('Progress')
+
+    def has_member(self, user):
+        """Returns True, if the given user is allowed to access this list."""
+        return self.pk in TaskList.objects.get_accessible_pks(user)
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the list with its tasks.
+
+        Deleting the tasks by the cascade would send the signals of every
+        single task, which update the counters and the cached rows of this
+        list and the search index once per task. So the tasks are deleted at
+        once before the list. Querysets of lists still use the cascade.
+
+        """
+        task_list_pk = self.pk
+        qn = connection.ops.quote_name
+        where = '{0} = %s'.format(qn(Task._meta.get_field('task_list').column))
+        through = Task.assigned_to.through._meta
+        with transaction.commit_on_success():
+            task_pks = list(self.tasks.order_by().values_list('pk', flat=True))
+            cursor = connection.cursor()
+            cursor.execute('DELETE FROM {0} WHERE {1} IN ({2})'.format(
+                qn(through.db_table), qn(through.get_field('task').column),
+                'SELECT {0} FROM {1} WHERE {2}'.format(
+                    qn(Task._meta.pk.column), qn(Task._meta.db_table),
+                    where)), [task_list_pk])
+            TaskAttachment.objects.filter(task__task_list=self).delete()
+            cursor.execute('DELETE FROM {0} WHERE {1}'.format(
+                qn(Task._meta.db_table), where), [task_list_pk])
+            super(TaskList, self).delete(*args, **kwargs)
+        get_search_backend().remove_tasks(task_pks)
+        bump_task_list_generation([task_list_pk])
+
+
+class ArchivedTaskManager(models.Manager):
+    """Custom manager for the ``ArchivedTask`` model."""
+    # SQLite allows at most 999 parameters in one statement
+    batch_size = 500
+
+    def archive_tasks(self, task_pks, done_before):
+        """
+        Moves the given tasks, that were done before the given date, with
+        their assignments and attachments to the archive and returns the
+        number of archived tasks.
+
+        The rows are copied and deleted with bulk queries in the running
+        transaction, at most ``batch_size`` tasks at once. The tasks are
+        locked and filtered by their done date again, so that tasks reopened
+        since their ids were selected are kept. The archived tasks keep their
+        ids.
+
+        """
+        task_pks = list(task_pks)
+        return sum([
+            self._archive_batch(task_pks[i:i + self.batch_size], done_before)
+            for i in range(0, len(task_pks), self.batch_size)])
+
+    def _archive_batch(self, task_pks, done_before):
+        """Archives the given tasks and returns their number."""
+        fields = Task._meta.local_fields
+        # the tasks may have been reopened since their ids were selected
+        rows = list(Task.objects.select_for_update().filter(
+            pk__in=task_pks, is_done__lt=done_before).order_by(
+                'pk').values_list(*[field.name for field in fields]))
+        if not rows:
+            return 0
+        today = now().date()
+        tasks = [self.model(archived=today, **dict(zip(
+            [field.attname for field in fields], row))) for row in rows]
+        pks = [task.pk for task in tasks]
+        self.bulk_create(tasks)
+        through = Task.assigned_to.through
+        ArchivedTask.assigned_to.through.objects.bulk_create([
+            ArchivedTask.assigned_to.through(
+                archivedtask_id=task_pk, user_id=user_pk)
+            for task_pk, user_pk in through.objects.filter(
+                task__in=pks).values_list('task_id', 'user_id')])
+        ArchivedTaskAttachment.objects.bulk_create([
+            ArchivedTaskAttachment(task_id=task_pk, file_id=file_pk)
+            for task_pk, file_pk in TaskAttachment.objects.filter(
+                task__in=pks).values_list('task', 'file')])
+        through.objects.filter(task__in=pks).delete()
+        TaskAttachment.objects.filter(task__in=pks).delete()
+        # deleting the tasks with the ORM would load them and send the signals
+        # of every single task, so we delete them at once and update the
+        # counters, the search index and the cached rows ourselves
+        qn = connection.ops.quote_name
+        connection.cursor().execute(
+            'DELETE FROM {0} WHERE {1} IN ({2})'.format(
+                qn(Task._meta.db_table), qn(Task._meta.pk.column),
+                ', '.join(['%s'] * len(pks))), pks)
+        counts = {}
+        for task in tasks:
+            count = counts.setdefault(task.task_list_id, [0, 0])
+            count[0] += 1
+            count[1] += int(bool(task.is_done))
+        for task_list_pk, count in counts.items():
+            TaskList.objects.add_to_counts(
+                task_list_pk, task_count=-count[0], done_count=-count[1])
+        get_search_backend().remove_tasks(pks)
+        bump_task_list_generation(counts.keys())
+        return len(tasks)
+
+
+class ArchivedTask(models.Model):
+    """
+    A task, that was moved out of the ``Task`` table.
+
+    Tasks, that were done a long time ago, are moved here by the
+    ``archive_done_tasks`` command, so that the queries of the open lists
+    don't have to cover them. It has the fields of ``Task`` and keeps its id.
+
+    :archived: The date, when the task was archived.
+
+    """
+    assigned_to = models.ManyToManyField(
+        'auth.User',
+        verbose_name=_('Users'),
+        related_name='archived_tasks',
+    )
+
+    category = models.ForeignKey(
+        'task_list.Category',
+        verbose_name=_('Category'),
+        blank=True, null=True,
+    )
+
+    description = models.TextField(
+        verbose_name=_('Description'),
+        max_length=4000,
+        blank=True,
+    )
+
+    due_date = models.DateField(
+        verbose_name=_('Due date'),
+        blank=True, null=True,
+    )
+
+    is_done = models.DateField(
+        verbose_name=_('Is done'),
+        blank=True, null=True,
+    )
+
+    priority = models.CharField(
+        verbose_name=_('Priority'),
+        max_length=8,
+        choices=PRIORITY_CHOICES,
+        default='3',
+    )
+
+    task_list = models.ForeignKey(
+        'task_list.TaskList',
+        verbose_name=_('Task list'),
+        related_name='archived_tasks',
+    )
+
+    title = models.CharField(
+        verbose_name=_('Title'),
+        max_length=256,
+    )
+
+    archived = models.DateField(
+        verbose_name=_('Archived'),
+    )
+
+    objects = ArchivedTaskManager()
+
+    def __unicode__(self):
+        return self.title
+
+    class Meta:
+        ordering = ['due_date', 'priority', 'title']
+        index_together = [['task_list', 'due_date', 'priority', 'title']]
+
+
+class ArchivedTaskAttachment(models.Model):
+    """
+    A ``TaskAttachment`` of an ``ArchivedTask``.
+
+    :file: Field that holds the file.
+    :task: The archived task the file is attached to.
+
+    """
+    file = FilerFileField(
+        verbose_name=_('Attachment'),
+        blank=True, null=True,
+    )
+
+    task = models.ForeignKey(
+        'task_list.ArchivedTask',
+        verbose_name=_('Task'),
+        related_name='attachments',
+    )
+
+    def __unicode__(self):
+        return self.task.title
+
+
+# =======
+# Signals
+# =======
+
+@receiver(m2m_changed, sender=TaskList.users.through)
+def task_list_users_changed(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """Invalidates the cached task lists of the users, that were changed."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        user_pks = [instance.pk]
+    elif pk_set is None:
+        # the relation is about to be cleared, so we need to ask the database
+        user_pks = instance.users.values_list('pk', flat=True)
+    else:
+        user_pks = pk_set
+    invalidate_accessible_task_lists(user_pks)
+
+
+@receiver(post_save, sender=Parent)
+@receiver(post_delete, sender=Parent)
+def parent_changed(sender, instance, **kwargs):
+    """Copies the content object of a list's ``Parent`` to the list."""
+    parent = Parent.objects.filter(task_list=instance.task_list_id).order_by(
+        '-pk').values('content_type', 'object_id')[:1]
+    parent = parent[0] if parent else {
+        'content_type': None, 'object_id': None}
+    TaskList.objects.filter(pk=instance.task_list_id).update(**parent)
+
+
+@receiver(pre_delete, sender=TaskList)
+def task_list_deleted(sender, instance, **kwargs):
+    """Invalidates the cached task lists of all users of a deleted list."""
+    invalidate_accessible_task_lists(
+        instance.users.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, **kwargs):
+    """Invalidates the cached fragments of the list of a changed task."""
+    bump_task_list_generation([instance.task_list_id])
+
+
+@receiver(post_init, sender=Task)
+def task_initialized(sender, instance, **kwargs):
+    """Remembers the list and the done state, that the counters include."""
+    instance._counted_state = (instance.task_list_id, bool(instance.is_done))
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """Updates the task counters of the lists of a saved task."""
+    state = (instance.task_list_id, bool(instance.is_done))
+    counted_state = None if created else instance._counted_state
+    if counted_state == state:
+        return
+    if counted_state is None:
+        TaskList.objects.add_to_counts(
+            instance.task_list_id, task_count=1, done_count=int(state[1]))
+    elif counted_state[0] == state[0]:
+        TaskList.objects.add_to_counts(
+            instance.task_list_id, done_count=state[1] - counted_state[1])
+    else:
+        # the task was moved to another list
+        TaskList.objects.add_to_counts(
+            counted_state[0], task_count=-1, done_count=-counted_state[1])
+        TaskList.objects.add_to_counts(
+            state[0], task_count=1, done_count=int(state[1]))
+    instance._counted_state = state
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    """Updates the task counters of the list of a deleted task."""
+    TaskList.objects.add_to_counts(
+        instance.task_list_id, task_count=-1,
+        done_count=-instance._counted_state[1])
+
+
+@receiver(post_save, sender=Task)
+def task_search_index_saved(sender, instance, **kwargs):
+    """Updates the search index entry of a saved task."""
+    get_search_backend().update_tasks([instance.pk])
+
+
+@receiver(post_delete, sender=Task)
+def task_search_index_deleted(sender, instance, **kwargs):
+    """Removes a deleted task from the search index."""
+    get_search_backend().remove_tasks([instance.pk])
+
+
+@receiver(post_init, sender=TaskList)
+def task_list_initialized(sender, instance, **kwargs):
+    """Remembers the title, that the search index includes."""
+    # a deferred title must not be loaded here
+    instance._indexed_title = instance.__dict__.get('title')
+
+
+@receiver(post_save, sender=TaskList)
+def task_list_search_index_saved(sender, instance, created, **kwargs):
+    """
+    Updates the search index entries of the tasks of a list, whose title was
+    changed.
+
+    A new list has no tasks yet, the tasks copied into it are indexed by
+    ``TaskListManager._copy_tasks``.
+
+    """
+    if not created and instance.title != getattr(
+            instance, '_indexed_title', None):
+        get_search_backend().update_task_list(instance.pk)
+    instance._indexed_title = instance.title
+
+
+@receiver(post_save, sender=Category)
+def category_search_index_saved(sender, instance, created, **kwargs):
+    """Updates the search index entries of the tasks of a saved category."""
+    if not created:
+        get_search_backend().update_category(instance.pk)
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assigned_to_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Invalidates the cached fragments of the lists of changed tasks."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        task_list_pks = [instance.task_list_id]
+    elif pk_set is None:
+        task_list_pks = instance.tasks.values_list('task_list', flat=True)
+    else:
+        task_list_pks = Task.objects.filter(pk__in=pk_set).values_list(
+            'task_list', flat=True)
+    bump_task_list_generation(set(task_list_pks))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=True, **kwargs):
+    """
+    Invalidates the cached task lists and permissions of new and deleted
+    users.
+
+    Some databases re-use the ids of deleted rows, so a new user should never
+    inherit the cached task lists or permissions of a former user with the
+    same id.
+
+    """
+    if created:
+        invalidate_accessible_task_lists([instance.pk])
+        invalidate_user_permissions(instance.pk)
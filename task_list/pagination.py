@@ -0,0 +1,221 @@
+"""Paginators for the ``task_list`` app."""
+import base64
+import json
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+from django.db.models import Q
+
+from . import app_settings
+
+
+def nulls_order_largest():
+    """Returns True, if the database sorts NULL after all other values."""
+    return connection.vendor in ('oracle', 'postgresql')
+
+
+def get_estimated_count(model, using='default'):
+    """
+    Returns the number of rows in the table of the model estimated by the
+    database or None, if the database has no estimate.
+
+    The estimate is read from the statistics of the database, so it is only
+    as accurate as the last ``ANALYZE`` run.
+
+    """
+    database = connections[using]
+    table = model._meta.db_table
+    cursor = database.cursor()
+    if database.vendor == 'postgresql':
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+    elif database.vendor == 'mysql':
+        cursor.execute(
+            'SELECT table_rows FROM information_schema.tables'
+            ' WHERE table_schema = DATABASE() AND table_name = %s', [table])
+    elif database.vendor == 'sqlite':
+        # the statistics table only exists after the first ANALYZE
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if not cursor.fetchone()[0]:
+            return None
+        # the statistic of each index starts with its number of rows, partial
+        # indexes have less rows than the table
+        cursor.execute(
+            'SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1'
+            ' WHERE tbl = %s', [table])
+    else:
+        return None
+    row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(row[0])
+    # PostgreSQL returns -1 for tables, that were never analyzed
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator, that doesn't count the rows of very large tables.
+
+    ``COUNT(*)`` has to read the whole table on most databases. If the object
+    list is an unfiltered queryset and the database estimates, that its table
+    has at least ``TASK_LIST_ESTIMATED_COUNT_THRESHOLD`` rows, this estimate
+    is used as the count instead. Otherwise, or if the setting is None, it
+    counts like the default paginator.
+
+    """
+    def get_estimated_count(self):
+        """Returns the estimated count or None, if it should not be used."""
+        threshold = app_settings.ESTIMATED_COUNT_THRESHOLD
+        queryset = self.object_list
+        if threshold is None or not hasattr(queryset, 'query'):
+            return None
+        query = queryset.query
+        if query.where or query.having or query.distinct or (
+                query.low_mark or query.high_mark is not None):
+            return None
+        estimate = get_estimated_count(queryset.model, using=queryset.db)
+        if estimate is None or estimate < threshold:
+            return None
+        return estimate
+
+    def _get_count(self):
+        if self._count is None:
+            self._count = self.get_estimated_count()
+        return super(EstimatedCountPaginator, self)._get_count()
+    count = property(_get_count)
+
+
+class KeysetPage(object):
+    """A single page of objects returned by the ``KeysetPaginator``."""
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        """Returns the cursor to get the page after this one."""
+        if self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        """Returns the cursor to get the page before this one."""
+        if self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator(object):
+    """
+    Paginates a queryset by the values of its ordering instead of offsets.
+
+    A page is fetched with a ``WHERE`` clause on the ordering values of the
+    last (or first) object of the page before, so that deep pages cost the
+    same as the first one, as long as an index matches the ordering.
+
+    :queryset: The queryset to paginate.
+    :per_page: The maximum number of objects on one page.
+    :ordering: A list of ascending field names. The last one must be unique,
+      usually it is ``pk``.
+
+    """
+    def __init__(self, queryset, per_page, ordering):
+        opts = queryset.model._meta
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [opts.pk if name == 'pk' else opts.get_field(name)
+                       for name in ordering]
+        if not self.fields[-1].unique:
+            raise ImproperlyConfigured(
+                'The last field of a keyset ordering must be unique.')
+
+    def decode_cursor(self, cursor):
+        """Returns the ordering values stored in the given cursor."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) if value is not None else None
+                    for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidPage('Invalid cursor.')
+
+    def encode_cursor(self, obj):
+        """Returns a cursor holding the ordering values of the object."""
+        values = [getattr(obj, field.attname) for field in self.fields]
+        return base64.urlsafe_b64encode(
+            json.dumps(values, cls=DjangoJSONEncoder))
+
+    def get_filter(self, values, reverse=False):
+        """
+        Returns a ``Q`` object matching all rows after the given values.
+
+        If ``reverse`` is True, it matches all rows before the given values.
+        NULL values are placed the way the database would sort them.
+
+        """
+        lookup = 'lt' if reverse else 'gt'
+        nulls_last = nulls_order_largest() != reverse
+        query = None
+        for name, field, value in reversed(
+                zip(self.ordering, self.fields, values)):
+            if value is None:
+                equal = Q(**{'{0}__isnull'.format(name): True})
+                after = None
+                if not nulls_last:
+                    after = Q(**{'{0}__isnull'.format(name): False})
+            else:
+                equal = Q(**{name: value})
+                after = Q(**{'{0}__{1}'.format(name, lookup): value})
+                if field.null and nulls_last:
+                    after |= Q(**{'{0}__isnull'.format(name): True})
+            if query is None:
+                query = after
+            elif after is None:
+                query = equal & query
+            else:
+                query = after | (equal & query)
+        return query
+
+    def page(self, after=None, before=None):
+        """
+        Returns the page following the ``after`` cursor or the page preceding
+        the ``before`` cursor. Without a cursor, the first page is returned.
+
+        """
+        if before:
+            queryset = self.queryset.filter(
+                self.get_filter(self.decode_cursor(before), reverse=True))
+            object_list = list(queryset.reverse()[:self.per_page + 1])
+            has_previous = len(object_list) > self.per_page
+            object_list = object_list[:self.per_page][::-1]
+            return KeysetPage(self, object_list, bool(object_list),
+                              has_previous)
+        queryset = self.queryset
+        if after:
+            queryset = queryset.filter(
+                self.get_filter(self.decode_cursor(after)))
+        object_list = list(queryset[:self.per_page + 1])
+        return KeysetPage(self, object_list[:self.per_page],
+                          len(object_list) > self.per_page, bool(after))
@@ -0,0 +1,104 @@
+"""
+Permission checks for the objects, that task lists can be attached to.
+
+When a view is called with a ``ctype_pk`` and an ``obj_pk``, the user must
+be permitted to access that object. The answer is given by the resolver set
+in ``TASK_LIST_PERMISSION_RESOLVER`` and cached for a short time.
+
+"""
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.importlib import import_module
+
+from . import app_settings
+from .utils import bump_generation, get_generation
+
+
+def default_permission_resolver(request, ctype, obj_pk):
+    """
+    Asks the model of the content type, if the user may access the object.
+
+    If the model has a ``task_list_has_permission_for_pk(request, obj_pk)``
+    classmethod, it is used, so that the model can answer without loading
+    the whole object. Otherwise the object is loaded and its
+    ``task_list_has_permission(request)`` method is called.
+
+    """
+    model = ctype.model_class()
+    has_permission_for_pk = getattr(
+        model, 'task_list_has_permission_for_pk', None)
+    if has_permission_for_pk is not None:
+        return has_permission_for_pk(request, obj_pk)
+    if not hasattr(model, 'task_list_has_permission'):
+        return False
+    try:
+        obj = ctype.get_object_for_this_type(pk=obj_pk)
+    except model.DoesNotExist:
+        return False
+    return obj.task_list_has_permission(request)
+
+
+def get_permission_resolver():
+    """Returns the function set in ``TASK_LIST_PERMISSION_RESOLVER``."""
+    module_name, attr = app_settings.PERMISSION_RESOLVER.rsplit('.', 1)
+    try:
+        return getattr(import_module(module_name), attr)
+    except (ImportError, AttributeError):
+        raise ImproperlyConfigured(
+            'TASK_LIST_PERMISSION_RESOLVER "{0}" cannot be imported.'.format(
+                app_settings.PERMISSION_RESOLVER))
+
+
+def get_object_generation_cache_key(ctype_pk, obj_pk):
+    """Returns the cache key for the permission generation of an object."""
+    return 'task_list_object_generation_{0}_{1}'.format(ctype_pk, obj_pk)
+
+
+def get_user_generation_cache_key(user_pk):
+    """Returns the cache key for the permission generation of a user."""
+    return 'task_list_user_generation_{0}'.format(user_pk)
+
+
+def get_permission_cache_key(user_pk, ctype_pk, obj_pk):
+    """Returns the cache key for the permission of a user on an object."""
+    return 'task_list_permission_{0}_{1}_{2}_{3}_{4}'.format(
+        ctype_pk, obj_pk, get_generation(
+            get_object_generation_cache_key(ctype_pk, obj_pk)), user_pk,
+        get_generation(get_user_generation_cache_key(user_pk)))
+
+
+def has_object_permission(request, ctype, obj_pk):
+    """
+    Returns True, if the user of the request may access the given object.
+
+    The result is cached per user and object for
+    ``TASK_LIST_PERMISSION_CACHE_TIMEOUT`` seconds.
+
+    """
+    key = get_permission_cache_key(request.user.pk, ctype.pk, obj_pk)
+    has_permission = cache.get(key)
+    if has_permission is None:
+        has_permission = bool(
+            get_permission_resolver()(request, ctype, obj_pk))
+        cache.set(key, has_permission, app_settings.PERMISSION_CACHE_TIMEOUT)
+    return has_permission
+
+
+def invalidate_object_permissions(ctype_pk, obj_pk, user_pk=None):
+    """
+    Removes the cached permissions for an object.
+
+    Host apps should call this, when the permissions on one of their objects
+    change. If ``user_pk`` is given, only the permission of this user is
+    removed, otherwise the permissions of all users.
+
+    """
+    if user_pk is not None:
+        cache.delete(get_permission_cache_key(user_pk, ctype_pk, obj_pk))
+    else:
+        bump_generation(get_object_generation_cache_key(ctype_pk, obj_pk))
+
+
+def invalidate_user_permissions(user_pk):
+    """Removes the cached permissions of a user on all objects."""
+    bump_generation(get_user_generation_cache_key(user_pk))
@@ -0,0 +1,178 @@
+"""
+Search backends for the tasks of the ``task_list`` app.
+
+The backend set in ``TASK_LIST_SEARCH_BACKEND`` is used by the ``TaskAdmin``
+and the ``TaskSearchView``. Backends, that keep their own index, are kept in
+sync by the signals in ``models.py``.
+
+"""
+import operator
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.utils.importlib import import_module
+
+from . import app_settings
+
+
+class BaseSearchBackend(object):
+    """
+    Base class of all search backends.
+
+    Backends without an own index only need to implement ``search``. The
+    index methods are called with the ids of the changed rows, after they
+    were saved.
+
+    """
+    def install(self, using='default'):
+        """Creates the index, if the backend needs one."""
+        pass
+
+    def rebuild(self):
+        """Adds all tasks to the index again."""
+        pass
+
+    def update_tasks(self, task_pks):
+        """Updates the index entries of the given tasks."""
+        pass
+
+    def update_task_list(self, task_list_pk):
+        """Updates the index entries of all tasks of a list."""
+        pass
+
+    def update_category(self, category_pk):
+        """Updates the index entries of all tasks of a category."""
+        pass
+
+    def remove_tasks(self, task_pks):
+        """Removes the given tasks from the index."""
+        pass
+
+    def search(self, queryset, search_term):
+        """
+        Returns the tasks of the queryset, that match all words of the
+        search term.
+
+        """
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Searches with ``icontains`` lookups, like the admin does by default.
+
+    It works with every database, but cannot use an index.
+
+    """
+    search_fields = ['title', 'description', 'category__title',
+                     'task_list__title']
+
+    def search(self, queryset, search_term):
+        for bit in search_term.split():
+            queryset = queryset.filter(reduce(operator.or_, [
+                Q(**{'{0}__icontains'.format(field): bit})
+                for field in self.search_fields]))
+        return queryset
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    """
+    Searches an SQLite FTS5 table, that holds the title, description,
+    category title and list title of every task.
+
+    Each word of the search term matches the words in these columns, that
+    start with it.
+
+    """
+    table = 'task_list_task_search'
+    batch_size = 500
+    select_tasks_sql = (
+        'SELECT task.id, task.title, task.description,'
+        ' COALESCE(category.title, \'\'), task_list.title'
+        ' FROM task_list_task task'
+        ' INNER JOIN task_list_tasklist task_list'
+        ' ON task.task_list_id = task_list.id'
+        ' LEFT OUTER JOIN task_list_category category'
+        ' ON task.category_id = category.id')
+
+    def install(self, using='default'):
+        if connections[using].vendor != 'sqlite':
+            raise ImproperlyConfigured(
+                'The SQLite FTS5 search backend needs an SQLite database.')
+        cursor = connections[using].cursor()
+        # the sqlite3 module commits the running transaction before every
+        # CREATE statement, so we only run it, if the table is missing
+        cursor.execute(
+            'SELECT COUNT(*) FROM sqlite_master WHERE name = %s', [self.table])
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE {0} USING fts5('
+                'title, description, category, task_list)'.format(self.table))
+
+    def _update(self, where, params):
+        cursor = connection.cursor()
+        cursor.execute(
+            'DELETE FROM {0} WHERE rowid IN ('
+            'SELECT task.id FROM task_list_task task WHERE {1})'.format(
+                self.table, where), params)
+        cursor.execute(
+            'INSERT INTO {0} (rowid, title, description, category,'
+            ' task_list) {1} WHERE {2}'.format(
+                self.table, self.select_tasks_sql, where), params)
+        # the signals run after the task was committed, so the index has to
+        # be committed as well
+        transaction.commit_unless_managed()
+
+    def rebuild(self):
+        connection.cursor().execute('DELETE FROM {0}'.format(self.table))
+        self._update('1 = 1', [])
+
+    def update_tasks(self, task_pks):
+        if task_pks:
+            self._update('task.id IN ({0})'.format(
+                ', '.join(['%s'] * len(task_pks))), list(task_pks))
+
+    def update_task_list(self, task_list_pk):
+        self._update('task.task_list_id = %s', [task_list_pk])
+
+    def update_category(self, category_pk):
+        self._update('task.category_id = %s', [category_pk])
+
+    def remove_tasks(self, task_pks):
+        task_pks = list(task_pks)
+        if not task_pks:
+            return
+        cursor = connection.cursor()
+        # SQLite allows at most 999 parameters in one statement
+        for i in range(0, len(task_pks), self.batch_size):
+            batch = task_pks[i:i + self.batch_size]
+            cursor.execute('DELETE FROM {0} WHERE rowid IN ({1})'.format(
+                self.table, ', '.join(['%s'] * len(batch))), batch)
+        transaction.commit_unless_managed()
+
+    def get_match_query(self, search_term):
+        """Returns the FTS5 query, that matches all words as prefixes."""
+        return ' '.join([
+            '"{0}"*'.format(bit.replace('"', '""'))
+            for bit in search_term.split()])
+
+    def search(self, queryset, search_term):
+        query = self.get_match_query(search_term)
+        if not query:
+            return queryset
+        return queryset.extra(where=[
+            '"{0}"."id" IN (SELECT rowid FROM {1} WHERE {1} MATCH %s)'.format(
+                queryset.model._meta.db_table, self.table)], params=[query])
+
+
+def get_search_backend():
+    """Returns an instance of the backend in ``TASK_LIST_SEARCH_BACKEND``."""
+    module_name, attr = app_settings.SEARCH_BACKEND.rsplit('.', 1)
+    try:
+        backend_class = getattr(import_module(module_name), attr)
+    except (ImportError, AttributeError):
+        raise ImproperlyConfigured(
+            'TASK_LIST_SEARCH_BACKEND "{0}" cannot be imported.'.format(
+                app_settings.SEARCH_BACKEND))
+    return backend_class()
@@ -0,0 +1,3 @@
+-- Partial index for the open tasks of a list. South installations get it from
+-- migration 0003.
+CREATE INDEX task_list_task_open ON task_list_task (task_list_id, due_date, priority, title) WHERE is_done IS NULL;
@@ -0,0 +1,75 @@
+/*
+ * Adds a search input to every select rendered by the
+ * ``UserAutocompleteWidget``. The users, whose username starts with the
+ * entered text, are loaded page by page from the ``data-autocomplete-url``
+ * of the select and added as options.
+ */
+(function () {
+    'use strict';
+
+    function load(select, term, after, more) {
+        var request = new XMLHttpRequest(),
+            url = select.getAttribute('data-autocomplete-url') +
+                '?q=' + encodeURIComponent(term);
+        if (after) {
+            url += '&after=' + encodeURIComponent(after);
+        }
+        request.onload = function () {
+            var data, i, option, existing = {};
+            if (request.status !== 200) {
+                return;
+            }
+            data = JSON.parse(request.responseText);
+            for (i = select.options.length - 1; i >= 0; i--) {
+                // only the selected users are kept from earlier searches
+                if (!after && !select.options[i].selected) {
+                    select.remove(i);
+                } else {
+                    existing[select.options[i].value] = true;
+                }
+            }
+            for (i = 0; i < data.results.length; i++) {
+                if (!existing[data.results[i].id]) {
+                    option = document.createElement('option');
+                    option.value = data.results[i].id;
+                    option.text = data.results[i].text;
+                    select.appendChild(option);
+                }
+            }
+            more.style.display = data.next ? '' : 'none';
+            more.onclick = function (event) {
+                event.preventDefault();
+                load(select, term, data.next, more);
+            };
+        };
+        request.open('GET', url);
+        request.send();
+    }
+
+    function init(select) {
+        var input = document.createElement('input'),
+            more = document.createElement('a'),
+            timeout;
+        input.type = 'text';
+        more.href = '#';
+        more.style.display = 'none';
+        more.appendChild(document.createTextNode('...'));
+        input.onkeyup = function () {
+            clearTimeout(timeout);
+            timeout = setTimeout(function () {
+                load(select, input.value, null, more);
+            }, 250);
+        };
+        select.parentNode.insertBefore(input, select);
+        select.parentNode.insertBefore(more, select.nextSibling);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var selects = document.querySelectorAll(
+                'select[data-autocomplete-url]'),
+            i;
+        for (i = 0; i < selects.length; i++) {
+            init(selects[i]);
+        }
+    });
+}());
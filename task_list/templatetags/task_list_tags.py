@@ -1,13 +1,45 @@
 """Template tags for the ``task_list`` app."""
 from django import template
-from django.core.urlresolvers import reverse
+
+from ..utils import cached_reverse
 
 register = template.Library()
 
 
 @register.simple_tag()
 def get_ctype_url(url_name, ctype_pk=None, obj_pk=None, **kwargs):
-    """Returns the correct url wheter or not a ctype_pk is given."""
+    """
+    Returns the correct url wheter or not a ctype_pk is given.
+
+    Every url is only resolved once, see ``utils.cached_reverse``.
+
+    """
     if ctype_pk:
         kwargs.update({'ctype_pk': ctype_pk, 'obj_pk': obj_pk})
-    return reverse(url_name, kwargs=kwargs)
+    return cached_reverse(url_name, kwargs)
+
+
+@register.filter
+def has_member(task_list, user):
+    """
+    Returns True, if the user is allowed to access the task list.
+
+    Usage::
+
+        {% if task_list|has_member:request.user %}...{% endif %}
+
+    """
+    return task_list.has_member(user)
+
+
+@register.filter
+def task_progress(task_list):
+    """
+    Returns the progress of the task list as text, i.e. "12/40 done".
+
+    Usage::
+
+        {{ task_list|task_progress }}
+
+    """
+    return task_list.get_progress()
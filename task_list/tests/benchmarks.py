@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the hot paths of the ``task_list`` app.
+
+Just like ``runtests.py`` this script sets up a fake Django environment, so
+you can run it from the root of the repository::
+
+    $ python task_list/tests/benchmarks.py --output=benchmarks.json
+
+The views, the copy methods of the ``TaskListManager`` and the
+``TaskDoneToggleForm`` are timed and their queries are counted against
+datasets of each of the given sizes, which are created by the
+``generate_task_data`` command with a fixed seed. The results can be
+compared with an earlier output::
+
+    $ python task_list/tests/benchmarks.py --baseline=benchmarks.json
+
+"""
+import itertools
+import json
+import optparse
+import sys
+import timeit
+from StringIO import StringIO
+
+from django.conf import settings
+import test_settings
+
+
+if not settings.configured:
+    # queries are only recorded while a benchmark runs, not while the data
+    # is generated
+    settings.configure(**dict(test_settings.__dict__, DEBUG=False))
+
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test.client import Client
+from django.test.utils import setup_test_environment
+
+from task_list.forms import TaskDoneToggleForm
+from task_list.models import TaskList
+from task_list.templatetags.task_list_tags import get_ctype_url
+
+
+# differences below a millisecond are mostly noise
+MIN_REGRESSION_SECONDS = 0.001
+
+
+def reverse_ctype_url(url_name, ctype_pk=None, obj_pk=None, **kwargs):
+    """The ``get_ctype_url`` template tag without the url cache."""
+    if ctype_pk:
+        kwargs.update({'ctype_pk': ctype_pk, 'obj_pk': obj_pk})
+    return reverse(url_name, kwargs=kwargs)
+
+
+def benchmark_get_ctype_url(rows=100, repeat=5):
+    """
+    Compares the ``get_ctype_url`` template tag with plain ``reverse`` calls.
+
+    Every row of ``task_list.html`` calls the tag twice, so each run builds
+    the urls of a list with the given number of rows.
+
+    """
+    results = {}
+    for name, func in [('reverse', reverse_ctype_url),
+                       ('get_ctype_url', get_ctype_url)]:
+        def render_rows():
+            for pk in range(rows):
+                func('task_toggle', pk=pk, ctype_pk=1, obj_pk=2)
+                func('task_update', pk=pk, ctype_pk=1, obj_pk=2)
+        timings = timeit.repeat(render_rows, number=10, repeat=repeat)
+        results[name] = min(timings) / (10 * rows * 2)
+    return results
+
+
+def get_dataset_options(size, seed):
+    """Returns the options of ``generate_task_data`` for a dataset size."""
+    return {
+        'tasks': size,
+        'lists': max(10, size // 50),
+        'templates': max(2, size // 5000),
+        'users': max(10, size // 500),
+        'categories': 20,
+        'seed': seed,
+        'stdout': StringIO(),
+    }
+
+
+def measure(func, repeat):
+    """
+    Calls the function ``repeat`` times and returns its best and median time
+    and the number of queries of the last call, when all caches are warm.
+
+    """
+    timings = []
+    for index in range(repeat):
+        reset_queries()
+        start = timeit.default_timer()
+        func()
+        timings.append(timeit.default_timer() - start)
+    timings.sort()
+    return {
+        'seconds': timings[0],
+        'median': timings[len(timings) // 2],
+        'queries': len(connection.queries),
+    }
+
+
+def get_benchmarks():
+    """
+    Returns a list of ``(name, function)`` tuples for the busiest user of
+    the current dataset, its largest list and the largest template.
+
+    """
+    user_pk = TaskList.users.through.objects.values('user').annotate(
+        lists=Count('id')).order_by('-lists', 'user')[0]['user']
+    task_list = TaskList.objects.filter(
+        users=user_pk, is_template=False).order_by('-task_count', 'pk')[0]
+    user = task_list.users.get(pk=user_pk)
+    user.set_password('test123')
+    user.save()
+    template = TaskList.objects.filter(is_template=True).order_by(
+        '-task_count', 'pk')[0]
+    template.users.add(user)
+    task = task_list.tasks.order_by('pk')[0]
+    task_pks = list(task_list.tasks.order_by('pk').values_list(
+        'pk', flat=True)[:100])
+    client = Client()
+    client.login(username=user.username, password='test123')
+    titles = ('Benchmark {0}'.format(index) for index in itertools.count())
+    bulk_toggle_states = itertools.cycle(['true', ''])
+
+    def request(url_name, method='get', data=None, **kwargs):
+        def view():
+            resp = getattr(client, method)(
+                reverse(url_name, kwargs=kwargs), data=data or {})
+            if resp.status_code not in (200, 302):
+                raise AssertionError('{0} returned {1}'.format(
+                    url_name, resp.status_code))
+            if resp.streaming:
+                ''.join(resp.streaming_content)
+        return view
+
+    def bulk_toggle():
+        request('task_bulk_toggle', method='post', data={
+            'tasks': task_pks, 'is_done': next(bulk_toggle_states)})()
+
+    def create_from_template():
+        TaskList.objects.create_from_template(template, next(titles), user)
+
+    def create_template_from_task_list():
+        # the title of the new template has to be unique for its owner
+        task_list.title = next(titles)
+        TaskList.objects.create_template_from_task_list(task_list, user)
+
+    def toggle_form():
+        form = TaskDoneToggleForm(task_list, data={'task': task.pk})
+        if not form.is_valid():
+            raise AssertionError(form.errors)
+        form.save()
+
+    return [
+        ('views.task_bulk_toggle', bulk_toggle),
+        ('views.task_create', request('task_create',
+                                      task_list_pk=task_list.pk)),
+        ('views.task_delete', request('task_delete', pk=task.pk)),
+        ('views.task_list', request('task_list', task_list_pk=task_list.pk)),
+        ('views.task_list_api', request('task_list_api',
+                                        task_list_pk=task_list.pk)),
+        ('views.task_list_archive', request('task_list_archive',
+                                            task_list_pk=task_list.pk)),
+        ('views.task_list_create', request('task_list_create')),
+        ('views.task_list_delete', request('task_list_delete',
+                                           pk=task_list.pk)),
+        ('views.task_list_list', request('task_list_list')),
+        ('views.task_list_list_api', request('task_list_api_list')),
+        ('views.task_list_update', request('task_list_update',
+                                           pk=task_list.pk)),
+        ('views.task_search', request('task_search', data={'q': 'order'})),
+        ('views.task_toggle', request('task_toggle', method='post',
+                                      data={'task': task.pk}, pk=task.pk)),
+        ('views.task_update', request('task_update', pk=task.pk)),
+        ('views.template_delete', request('template_delete',
+                                          pk=template.pk)),
+        ('views.template_list', request('template_list')),
+        ('views.template_update', request('template_update',
+                                          pk=template.pk)),
+        ('views.user_autocomplete', request('task_list_api_users',
+                                            data={'q': 'synthetic1'})),
+        ('manager.create_from_template', create_from_template),
+        ('manager.create_template_from_task_list',
+         create_template_from_task_list),
+        ('forms.task_done_toggle', toggle_form),
+    ]
+
+
+def benchmark_datasets(sizes, seed=0, repeat=5):
+    """
+    Runs all benchmarks against a new database for each dataset size.
+
+    Returns a dict of the results by benchmark name and size.
+
+    """
+    setup_test_environment()
+    results = {}
+    for size in sizes:
+        old_name = connection.creation.create_test_db(verbosity=0)
+        cache.clear()
+        call_command('generate_task_data', **get_dataset_options(size, seed))
+        connection.use_debug_cursor = True
+        for name, func in get_benchmarks():
+            results.setdefault(name, {})[str(size)] = measure(func, repeat)
+        connection.use_debug_cursor = False
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of the regressions against the baseline results.
+
+    A benchmark regressed, if it needs more queries or if its best time is
+    more than ``tolerance`` times the time of the baseline and at least
+    ``MIN_REGRESSION_SECONDS`` slower.
+
+    """
+    regressions = []
+    for name, sizes in sorted(results.items()):
+        for size, result in sorted(sizes.items(), key=lambda x: int(x[0])):
+            old = baseline.get(name, {}).get(size)
+            if old is None:
+                continue
+            if result['queries'] > old['queries']:
+                regressions.append(
+                    '{0} ({1}): {2} queries instead of {3}'.format(
+                        name, size, result['queries'], old['queries']))
+            if (result['seconds'] > old['seconds'] * tolerance and
+                    result['seconds'] - old['seconds'] >=
+                    MIN_REGRESSION_SECONDS):
+                regressions.append(
+                    '{0} ({1}): {2:.1f} ms instead of {3:.1f} ms'.format(
+                        name, size, result['seconds'] * 1000,
+                        old['seconds'] * 1000))
+    return regressions
+
+
+def main(argv=None):
+    # optparse instead of argparse, which is missing in Python 2.6
+    parser = optparse.OptionParser(description=__doc__.split('\n\n')[0])
+    parser.add_option(
+        '--sizes', default='1000,10000,100000',
+        help='Comma separated numbers of tasks of the datasets.')
+    parser.add_option('--seed', type='int', default=0)
+    parser.add_option('--repeat', type='int', default=5)
+    parser.add_option(
+        '--output', help='The JSON file, that the results are written to.')
+    parser.add_option(
+        '--baseline', help='A JSON file of earlier results to compare with.')
+    parser.add_option(
+        '--tolerance', type='float', default=1.25,
+        help='The allowed ratio of the times to the baseline.')
+    args = parser.parse_args(argv)[0]
+
+    results = benchmark_get_ctype_url()
+    for name, seconds in sorted(results.items()):
+        print('{0}: {1:.2f} us per url'.format(name, seconds * 1000000))
+    print('speedup: {0:.1f}x'.format(
+        results['reverse'] / results['get_ctype_url']))
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = benchmark_datasets(sizes, seed=args.seed, repeat=args.repeat)
+    print('\n{0:<45}'.format('tasks') + ''.join(
+        '{0:>20}'.format(size) for size in sizes))
+    for name, by_size in sorted(results.items()):
+        print('{0:<45}'.format(name) + ''.join(
+            '{0:>11.1f} ms {1:>3} q'.format(
+                by_size[str(size)]['seconds'] * 1000,
+                by_size[str(size)]['queries']) for size in sizes))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'seed': args.seed, 'repeat': args.repeat,
+                       'results': results}, output, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(
+                results, json.load(baseline)['results'], args.tolerance)
+        for regression in regressions:
+            print('REGRESSION {0}'.format(regression))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,11 @@
 """Factories for the models of the ``task_list`` app."""
+from datetime import date
+
 import factory
 
 from ..models import (
+    ArchivedTask,
+    ArchivedTaskAttachment,
     Category,
     Parent,
     Task,
@@ -19,6 +23,23 @@ class DummyModelFactory(factory.Factory):
     dummy_field = factory.Sequence(lambda n: 'dummy {0}'.format(n))
 
 
+class ArchivedTaskFactory(factory.Factory):
+    """Factory for the ``ArchivedTask`` model."""
+    FACTORY_FOR = ArchivedTask
+
+    title = factory.Sequence(lambda n: 'archived task{0}'.format(n))
+    task_list = factory.SubFactory('task_list.tests.factories.TaskListFactory')
+    is_done = date(2013, 1, 1)
+    archived = date(2014, 1, 1)
+
+
+class ArchivedTaskAttachmentFactory(factory.Factory):
+    """Factory for the ``ArchivedTaskAttachment`` model."""
+    FACTORY_FOR = ArchivedTaskAttachment
+
+    task = factory.SubFactory('task_list.tests.factories.ArchivedTaskFactory')
+
+
 class CategoryFactory(factory.Factory):
     """Factory for the ``Category`` model."""
     FACTORY_FOR = Category
@@ -8,6 +8,7 @@ from django.test import TestCase
 from django_libs.tests.factories import UserFactory
 
 from ..forms import (
+    TaskBulkDoneToggleForm,
     TaskCreateForm,
     TaskDoneToggleForm,
     TaskListCreateForm,
@@ -16,9 +17,98 @@ from ..forms import (
     TemplateForm,
 )
 from ..models import Parent, Task, TaskList
+from ..utils import get_task_list_generation
 from .factories import TaskFactory, TaskListFactory
 
 
+class TaskBulkDoneToggleFormTestCase(TestCase):
+    """Test for the ``TaskBulkDoneToggleForm`` form class."""
+    longMessage = True
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.task_list = TaskListFactory()
+        self.task_list.users.add(self.user)
+        self.tasks = TaskFactory.create_batch(3, task_list=self.task_list)
+        self.other_task = TaskFactory()
+        self.valid_data = {
+            'tasks': [task.pk for task in self.tasks[:2]],
+            'is_done': 'true',
+        }
+
+    def test_form(self):
+        bad_data = self.valid_data.copy()
+        bad_data.update({'tasks': [self.tasks[0].pk, self.other_task.pk]})
+        form = TaskBulkDoneToggleForm(data=bad_data, user=self.user)
+        self.assertFalse(form.is_valid(), msg=(
+            'With tasks of other lists, the form should not be valid.'))
+
+        template = TaskListFactory(is_template=True)
+        template.users.add(self.user)
+        bad_data.update({'tasks': [TaskFactory(task_list=template).pk]})
+        form = TaskBulkDoneToggleForm(data=bad_data, user=self.user)
+        self.assertFalse(form.is_valid(), msg=(
+            'With tasks of templates, the form should not be valid.'))
+
+        form = TaskBulkDoneToggleForm(data=self.valid_data, user=self.user)
+        generation = get_task_list_generation(self.task_list.pk)
+        # validation, the locking select, the update and the counter
+        with self.assertNumQueries(4):
+            self.assertTrue(form.is_valid(), msg=(
+                'With correct data, the form should be valid.'))
+            form.save()
+        self.assertNotEqual(
+            get_task_list_generation(self.task_list.pk), generation,
+            msg='Toggling tasks should invalidate the cache of their lists.')
+        self.assertEqual(
+            Task.objects.filter(is_done__isnull=False).count(), 2, msg=(
+                'After save is called, two tasks should be done.'))
+        self.assertEqual(
+            TaskList.objects.get(pk=self.task_list.pk).done_count, 2, msg=(
+                'The done counter of the list should be increased.'))
+
+        form = TaskBulkDoneToggleForm(data=self.valid_data, user=self.user)
+        self.assertTrue(form.is_valid(), msg=(
+            'With correct data, the form should be valid.'))
+        generation = get_task_list_generation(self.task_list.pk)
+        self.assertEqual(form.save(), 0, msg=(
+            'Tasks, that are done already, should not be changed again.'))
+        self.assertEqual(
+            get_task_list_generation(self.task_list.pk), generation,
+            msg='Lists without changed tasks should keep their cache.')
+
+        data = self.valid_data.copy()
+        data.update({'is_done': 'false'})
+        form = TaskBulkDoneToggleForm(data=data, user=self.user)
+        self.assertTrue(form.is_valid(), msg=(
+            'With correct data, the form should be valid.'))
+        form.save()
+        self.assertEqual(
+            Task.objects.filter(is_done__isnull=False).count(), 0, msg=(
+                'After save is called again, no task should be done.'))
+        self.assertEqual(
+            TaskList.objects.get(pk=self.task_list.pk).done_count, 0, msg=(
+                'The done counter of the list should be decreased.'))
+
+    def test_many_lists(self):
+        other_list = TaskListFactory()
+        other_list.users.add(self.user)
+        other_tasks = TaskFactory.create_batch(2, task_list=other_list)
+        data = self.valid_data.copy()
+        data.update({'tasks': [task.pk for task in self.tasks + other_tasks]})
+        form = TaskBulkDoneToggleForm(data=data, user=self.user)
+        self.assertTrue(form.is_valid())
+        # the tasks of both lists are updated at once, only the counters are
+        # updated per list
+        with self.assertNumQueries(4):
+            self.assertEqual(form.save(), 5)
+        self.assertEqual([
+            TaskList.objects.get(pk=self.task_list.pk).done_count,
+            TaskList.objects.get(pk=other_list.pk).done_count], [3, 2], msg=(
+                'The done counter of each list should be increased by its'
+                ' toggled tasks.'))
+
+
 class TaskCreateFormTestCase(TestCase):
     """Test for the ``TaskCreateForm`` form class."""
     longMessage = True
@@ -43,12 +133,23 @@ class TaskCreateFormTestCase(TestCase):
 
         self.assertEqual(instance.assigned_to.all()[0], self.user, msg=(
             'After save, the user should be assigned to the task.'))
+        self.assertEqual(
+            TaskList.objects.get(pk=self.task_list.pk).task_count, 1, msg=(
+                'The task counter of the list should be increased.'))
 
         form = TaskCreateForm(data={}, user=self.user,
                               task_list=self.task_list)
         self.assertFalse(form.is_valid(), msg=(
             'Without correct data, the form should not be valid.'))
 
+    def test_queries(self):
+        form = TaskCreateForm(data=self.valid_data, user=self.user,
+                              task_list=self.task_list)
+        self.assertTrue(form.is_valid())
+        # insert, counter and search index of the task, and the assignment
+        with self.assertNumQueries(5):
+            form.save()
+
 
 class TaskDoneToggleFormTestCase(TestCase):
     """Test for the ``TaskDoneToggleForm`` form class."""
@@ -59,15 +160,76 @@ class TaskDoneToggleFormTestCase(TestCase):
         self.valid_data = {'task': self.task.pk}
 
     def test_form(self):
-        form = TaskDoneToggleForm(data=self.valid_data)
+        form = TaskDoneToggleForm(data={'task': TaskFactory().pk},
+                                  task_list=self.task.task_list)
+        self.assertFalse(form.is_valid(), msg=(
+            'With a task of another list, the form should not be valid.'))
+
+        form = TaskDoneToggleForm(data=self.valid_data,
+                                  task_list=self.task.task_list)
         self.assertTrue(form.is_valid(), msg='The form should be valid.')
-        form.save()
-        self.assertEqual(type(Task.objects.get().is_done), date, msg=(
-            'After save is called, is_done should be a date.'))
+        generation = get_task_list_generation(self.task.task_list.pk)
+        with self.assertNumQueries(2):
+            task = form.save()
+        self.assertNotEqual(
+            get_task_list_generation(self.task.task_list.pk), generation,
+            msg='Toggling a task should invalidate the cache of its list.')
+        self.assertEqual(type(Task.objects.get(pk=self.task.pk).is_done),
+                         date, msg=(
+                             'After save is called, is_done should be a'
+                             ' date.'))
+        self.assertTrue(task.is_done, msg=(
+            'The returned task should be done.'))
+        self.assertEqual(
+            TaskList.objects.get(pk=self.task.task_list.pk).done_count, 1,
+            msg='The done counter of the list should be increased.')
+        task.save()
+        self.assertEqual(
+            TaskList.objects.get(pk=self.task.task_list.pk).done_count, 1,
+            msg='Saving the returned task should not count it again.')
 
+        form = TaskDoneToggleForm(data=self.valid_data,
+                                  task_list=self.task.task_list)
+        self.assertTrue(form.is_valid(), msg='The form should be valid.')
         form.save()
-        self.assertEqual(Task.objects.get().is_done, None, msg=(
-            'After save is called again, is_done should be None again.'))
+        self.assertEqual(Task.objects.get(pk=self.task.pk).is_done, None,
+                         msg=(
+                             'After save is called again, is_done should be'
+                             ' None again.'))
+
+    def test_concurrent_changes(self):
+        form = TaskDoneToggleForm(data=self.valid_data,
+                                  task_list=self.task.task_list)
+        self.assertTrue(form.is_valid(), msg='The form should be valid.')
+        # another request toggles the task and counts it
+        Task.objects.filter(pk=self.task.pk).update(
+            title='changed', is_done=date(2013, 1, 1))
+        TaskList.objects.add_to_counts(self.task.task_list_id, done_count=1)
+        returned_task = form.save()
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(task.title, 'changed', msg=(
+            'Other columns should not be overwritten.'))
+        self.assertEqual(task.is_done, date(2013, 1, 1), msg=(
+            'A task, that was toggled in the meantime, should not be toggled'
+            ' back.'))
+        returned_task.save()
+        self.assertEqual(
+            TaskList.objects.get(pk=self.task.task_list_id).done_count, 1,
+            msg=('Saving the returned task should not count the state of the'
+                 ' other request again.'))
+
+    def test_deleted_task(self):
+        form = TaskDoneToggleForm(data=self.valid_data,
+                                  task_list=self.task.task_list)
+        self.assertTrue(form.is_valid(), msg='The form should be valid.')
+        Task.objects.get(pk=self.task.pk).delete()
+        task = form.save()
+        self.assertEqual(task.is_done, None, msg=(
+            'A task, that was deleted in the meantime, should not be'
+            ' toggled.'))
+        self.assertEqual(
+            TaskList.objects.get(pk=self.task.task_list_id).done_count, 0,
+            msg='A deleted task should not be counted.')
 
 
 class TaskListCreateFormTestCase(TestCase):
@@ -129,6 +291,13 @@ class TaskListCreateFormTestCase(TestCase):
         self.assertEqual(Task.objects.count(), 2, msg=(
             'After save is called, there should be two tasks in the db.'))
 
+    def test_queries(self):
+        form = TaskListCreateForm(data=self.valid_data, user=self.user)
+        self.assertTrue(form.is_valid())
+        # insert of the list and of its member
+        with self.assertNumQueries(2):
+            form.save()
+
 
 class TaskListUpdateFormTestCase(TestCase):
     """Test for the ``TaskListUpdateForm`` form class."""
@@ -166,6 +335,40 @@ class TaskListUpdateFormTestCase(TestCase):
         self.assertFalse(form.is_valid(), msg=(
             'Without correct data, the form should not be valid.'))
 
+    def test_users(self):
+        unrelated_user = UserFactory()
+        # one query for the initial users and one to render them
+        with self.assertNumQueries(2):
+            form = TaskListUpdateForm(user=self.user, instance=self.task_list)
+            html = form['users'].as_widget()
+        self.assertIn('value="{0}"'.format(self.user.pk), html, msg=(
+            'The users of the list should be rendered.'))
+        self.assertNotIn('value="{0}"'.format(unrelated_user.pk), html, msg=(
+            'Other users should not be rendered.'))
+        self.assertIn('data-autocomplete-url="/api/users/"', html, msg=(
+            'The widget should load other users from the autocomplete.'))
+
+        form = TaskListUpdateForm(data=self.valid_data, user=self.user,
+                                  instance=self.task_list)
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid(), msg=(
+                'The submitted users should be validated with one query.'))
+
+    def test_queries(self):
+        form = TaskListUpdateForm(data=self.valid_data, user=self.user,
+                                  instance=self.task_list)
+        self.assertTrue(form.is_valid())
+        # the submitted users replace the old ones, before the current user
+        # is added, if missing
+        with self.assertNumQueries(10):
+            form.save()
+        form = TaskListUpdateForm(data={'title': 'title', 'users': [
+            self.user.pk, self.other_user.pk]}, user=self.user,
+            instance=self.task_list)
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(10):
+            form.save()
+
 
 class TaskUpdateFormTestCase(TestCase):
     """Test for the ``TaskUpdateForm`` form class."""
@@ -216,6 +419,37 @@ class TaskUpdateFormTestCase(TestCase):
         self.assertFalse(form.is_valid(), msg=(
             'Without correct data, the form should not be valid.'))
 
+    def test_assigned_to(self):
+        self.task.task_list.users.add(self.other_user)
+        form = TaskUpdateForm(data=self.valid_data, user=self.user,
+                              task_list=self.task.task_list,
+                              instance=self.task)
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid(), msg=(
+                'The submitted users should be validated with one query.'))
+
+        form = TaskUpdateForm(user=self.user, task_list=self.task.task_list,
+                              instance=self.task)
+        html = form['assigned_to'].as_widget()
+        self.assertIn('value="{0}"'.format(self.user.pk), html, msg=(
+            'The assigned users should be rendered.'))
+        self.assertNotIn('value="{0}"'.format(self.other_user.pk), html, msg=(
+            'Other members of the list should not be rendered.'))
+        self.assertIn('data-autocomplete-url="/api/users/{0}/"'.format(
+            self.task.task_list.pk), html, msg=(
+                'The autocomplete should only search the list members.'))
+
+    def test_queries(self):
+        self.task.task_list.users.add(self.other_user)
+        form = TaskUpdateForm(data=self.valid_data, user=self.user,
+                              task_list=self.task.task_list,
+                              instance=self.task)
+        self.assertTrue(form.is_valid())
+        # the submitted users replace the old ones, before the current user
+        # is added, if missing
+        with self.assertNumQueries(9):
+            form.save()
+
 
 class TemplateFormTestCase(TestCase):
     """Tests for the ``TemplateForm`` form class."""
@@ -226,7 +460,8 @@ class TemplateFormTestCase(TestCase):
         self.task_list = TaskListFactory(title='title')
         self.task_list.users.add(self.user)
         self.task = TaskFactory(task_list=self.task_list)
-        self.existing_template = TaskListFactory(is_template=True, title='bar')
+        self.existing_template = TaskListFactory(
+            is_template=True, title='bar', template_owner=self.user)
         self.existing_template.users.add(self.user)
         self.valid_data = {'title': 'my title'}
 
@@ -262,3 +497,44 @@ class TemplateFormTestCase(TestCase):
         self.assertEqual(Task.objects.count(), 2, msg=(
             'After the template is saved again, there should still be 2 tasks'
             ' in the db.'))
+
+    def test_concurrent_duplicates(self):
+        form = TemplateForm(data={'title': 'baz'}, user=self.user,
+                            instance=self.task_list)
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid(), msg=(
+                'The title should be checked with one query.'))
+        TaskListFactory(is_template=True, title='baz',
+                        template_owner=self.user)
+        self.assertIsNone(form.save(), msg=(
+            'A template, that got the same title meanwhile, should not be'
+            ' saved.'))
+        self.assertEqual(form.errors['title'], [
+            TemplateForm.duplicate_title_error], msg=(
+            'The duplicate title should be reported by the form.'))
+
+        form = TemplateForm(data={'title': 'baz'}, user=self.user,
+                            instance=self.existing_template)
+        self.assertFalse(form.is_valid(), msg=(
+            'A template should not be renamed to a title of the owner.'))
+        form = TemplateForm(data={'title': 'qux'}, user=self.user,
+                            instance=self.existing_template)
+        self.assertTrue(form.is_valid())
+        TaskListFactory(is_template=True, title='qux',
+                        template_owner=self.user)
+        self.assertIsNone(form.save(), msg=(
+            'A template should not be renamed to a title, that was taken'
+            ' meanwhile.'))
+        self.assertIn('title', form.errors)
+        self.assertEqual(
+            TaskList.objects.get(pk=self.existing_template.pk).title, 'bar',
+            msg='The template should keep its title.')
+
+    def test_queries(self):
+        self.existing_template.users.add(UserFactory())
+        form = TemplateForm(data=self.valid_data, user=self.user,
+                            instance=self.existing_template)
+        self.assertTrue(form.is_valid())
+        # update and search index of the template, and its member
+        with self.assertNumQueries(5):
+            form.save()
@@ -0,0 +1,154 @@
+"""Tests for the instrumentation of the ``task_list`` app."""
+import socket
+
+from django.conf import global_settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.http import HttpRequest
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from django_libs.tests.factories import UserFactory
+from mock import patch
+
+from ..instrumentation import (
+    InstrumentationMiddleware,
+    LoggingSink,
+    MemorySink,
+    StatsdSink,
+    get_metrics_sink,
+    record_time,
+)
+from .factories import TaskFactory, TaskListFactory
+
+
+class GetMetricsSinkTestCase(TestCase):
+    """Tests for the ``get_metrics_sink`` function."""
+    longMessage = True
+
+    def test_function(self):
+        self.assertIsNone(get_metrics_sink(), msg=(
+            'Without a configured sink, there should be no sink.'))
+        with patch('task_list.instrumentation.app_settings.METRICS_SINK',
+                   'task_list.instrumentation.MemorySink'):
+            self.assertIsInstance(get_metrics_sink(), MemorySink, msg=(
+                'Should return an instance of the configured sink.'))
+        with patch('task_list.instrumentation.app_settings.METRICS_SINK',
+                   'task_list.instrumentation.FooSink'):
+            self.assertRaises(ImproperlyConfigured, get_metrics_sink)
+
+
+class RecordTimeTestCase(TestCase):
+    """Tests for the ``record_time`` context manager."""
+    longMessage = True
+
+    def test_context_manager(self):
+        request = HttpRequest()
+        with record_time(request, 'permission_time'):
+            pass
+        self.assertFalse(hasattr(request, '_task_list_metrics'), msg=(
+            'Requests, that are not instrumented, should be left alone.'))
+        request._task_list_metrics = {}
+        for index in range(2):
+            with record_time(request, 'permission_time'):
+                pass
+        self.assertGreaterEqual(
+            request._task_list_metrics['permission_time'], 0, msg=(
+                'The time of the block should be added to the metric.'))
+
+
+class LoggingSinkTestCase(TestCase):
+    """Tests for the ``LoggingSink`` class."""
+    longMessage = True
+
+    def test_publish(self):
+        with patch('task_list.instrumentation.logger') as logger:
+            LoggingSink().publish('task_list.views.TaskListView',
+                                  {'queries': 3, 'sql_time': 0.5})
+        self.assertEqual(logger.info.call_args[0][1:], (
+            'task_list.views.TaskListView', 'queries=3 sql_time=0.5'), msg=(
+            'Should log the view and its metrics.'))
+
+
+class StatsdSinkTestCase(TestCase):
+    """Tests for the ``StatsdSink`` class."""
+    longMessage = True
+
+    def test_publish(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.settimeout(5)
+        with patch('task_list.instrumentation.app_settings.'
+                   'METRICS_STATSD_ADDRESS', listener.getsockname()):
+            StatsdSink().publish('task_list.views.TaskListView',
+                                 {'queries': 3, 'sql_time': 0.0125})
+        try:
+            datagram = listener.recv(1024)
+        finally:
+            listener.close()
+        self.assertEqual(datagram.decode('utf-8').split('\n'), [
+            'task_list.TaskListView.requests:1|c',
+            'task_list.TaskListView.queries:3|c',
+            'task_list.TaskListView.sql_time:12.500|ms',
+        ], msg='A local listener should receive all metrics in one datagram.')
+
+        with patch('task_list.instrumentation.app_settings.'
+                   'METRICS_STATSD_ADDRESS', ('256.0.0.1', 8125)):
+            StatsdSink().publish('task_list.views.TaskListView', {})
+
+
+@override_settings(MIDDLEWARE_CLASSES=(
+    global_settings.MIDDLEWARE_CLASSES +
+    ('task_list.instrumentation.InstrumentationMiddleware', )))
+@patch('task_list.instrumentation.app_settings.METRICS_SINK',
+       'task_list.instrumentation.MemorySink')
+class InstrumentationMiddlewareTestCase(TestCase):
+    """Tests for the ``InstrumentationMiddleware`` class."""
+    longMessage = True
+
+    def setUp(self):
+        MemorySink.clear()
+        self.user = UserFactory()
+        self.task_list = TaskListFactory()
+        self.task_list.users.add(self.user)
+        TaskFactory(task_list=self.task_list)
+        self.client.login(username=self.user.username, password='test123')
+
+    def tearDown(self):
+        MemorySink.clear()
+
+    def test_disabled(self):
+        with patch('task_list.instrumentation.app_settings.METRICS_SINK',
+                   None):
+            self.assertRaises(MiddlewareNotUsed, InstrumentationMiddleware)
+
+    def test_view(self):
+        resp = self.client.get(reverse('task_list', kwargs={
+            'task_list_pk': self.task_list.pk}))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(MemorySink.records), 1, msg=(
+            'The metrics of the request should be published once.'))
+        view_name, metrics = MemorySink.records[0]
+        self.assertEqual(view_name, 'task_list.views.TaskListView')
+        self.assertEqual(sorted(metrics), [
+            'permission_time', 'queries', 'render_time', 'sql_time',
+            'total_time'], msg='Should publish all metrics of the view.')
+        self.assertGreater(metrics['queries'], 0, msg=(
+            'The queries should be counted, even if DEBUG is False.'))
+        self.assertIsNone(connection.use_debug_cursor, msg=(
+            'The debug cursor should be reset after the request.'))
+
+    def test_streaming_view(self):
+        resp = self.client.get(reverse('task_list_api', kwargs={
+            'task_list_pk': self.task_list.pk}))
+        self.assertEqual(resp.status_code, 200)
+        ''.join(resp.streaming_content)
+        self.assertEqual(len(MemorySink.records), 1, msg=(
+            'Streaming responses should be published, when they are closed.'))
+        self.assertGreater(MemorySink.records[0][1]['queries'], 0)
+
+    def test_other_view(self):
+        self.client.get(reverse('dummy_login'))
+        self.assertEqual(len(MemorySink.records), 0, msg=(
+            'Views of other apps should not be instrumented.'))
@@ -0,0 +1,69 @@
+"""Tests for the admins of the ``task_list`` app."""
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from django_libs.tests.factories import UserFactory
+from mock import patch
+
+from ..factories import (
+    ArchivedTaskFactory,
+    CategoryFactory,
+    ParentFactory,
+    TaskAttachmentFactory,
+    TaskFactory,
+)
+
+
+class ChangeListTestCase(TestCase):
+    """Tests for the changelists of the ``task_list`` admins."""
+    longMessage = True
+
+    def setUp(self):
+        self.user = UserFactory(is_staff=True, is_superuser=True)
+        self.client.login(username=self.user.username, password='test123')
+
+    def assertQueriesDontGrow(self, model_name, factory, num, **kwargs):
+        """
+        Asserts, that the changelist of the model needs ``num`` queries for
+        one and for several rows.
+
+        """
+        url = reverse('admin:task_list_{0}_changelist'.format(model_name))
+        factory(**kwargs)
+        with self.assertNumQueries(num):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        factory.create_batch(5, **kwargs)
+        # the number of queries should not grow with the rows
+        with self.assertNumQueries(num):
+            self.client.get(url)
+
+    def test_changelists(self):
+        self.assertQueriesDontGrow(
+            'task', TaskFactory, 4, category=CategoryFactory())
+        self.assertQueriesDontGrow('parent', ParentFactory, 4)
+        self.assertQueriesDontGrow('taskattachment', TaskAttachmentFactory, 4)
+        self.assertQueriesDontGrow('archivedtask', ArchivedTaskFactory, 4)
+
+    def test_search(self):
+        task = TaskFactory(title='Order flowers')
+        TaskFactory(title='Book the band')
+        resp = self.client.get(
+            reverse('admin:task_list_task_changelist'), data={'q': 'flow'})
+        self.assertEqual(list(resp.context['cl'].result_list), [task], msg=(
+            'The search backend should find the tasks.'))
+
+    def test_full_result_count(self):
+        task = TaskFactory(title='Order flowers')
+        TaskFactory(title='Book the band')
+        with patch('task_list.pagination.app_settings.'
+                   'ESTIMATED_COUNT_THRESHOLD', 1), patch(
+                'task_list.pagination.get_estimated_count', return_value=100):
+            resp = self.client.get(reverse('admin:task_list_task_changelist'),
+                                   data={'q': 'flow'})
+        cl = resp.context['cl']
+        self.assertEqual(list(cl.result_list), [task])
+        self.assertEqual(cl.result_count, 1, msg=(
+            'The search results should be counted exactly.'))
+        self.assertEqual(cl.full_result_count, 100, msg=(
+            'The total number of tasks should be estimated.'))
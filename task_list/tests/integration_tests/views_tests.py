@@ -1,8 +1,13 @@
 """Tests for the views of the ``task_list`` app."""
+import json
+from datetime import date
+
 from mock import Mock, patch
 
 from django.core.urlresolvers import reverse
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection, reset_queries
 from django.test import TestCase
 
 from django_libs.tests.factories import UserFactory
@@ -16,11 +21,13 @@ from ...forms import (
     TemplateForm,
 )
 from ..factories import (
+    ArchivedTaskFactory,
     DummyModelFactory,
     ParentFactory,
     TaskFactory,
     TaskListFactory,
 )
+from ...models import Task, TaskList
 from ..test_app.models import DummyModel
 
 
@@ -37,14 +44,116 @@ class PatchedViewTestMixin(ViewTestMixin):
             reverse('dummy_login'), url))
 
 
+class QueryBudgetViewTestMixin(PatchedViewTestMixin):
+    """
+    Checks, that a view stays within its query budget, when the data grows.
+
+    Every test case declares the ``query_budget`` of its view. The view is
+    requested by ``self.user`` with ``budget_method`` and the data of
+    ``get_budget_data`` before and after ``grow_data`` was called, and has to
+    run the same number of queries both times.
+
+    """
+    budget_method = 'get'
+    query_budget = None
+
+    def get_budget_data(self):
+        return {}
+
+    def count_queries(self):
+        """
+        Returns the number of queries of the second of two requests, so that
+        the caches are warm.
+
+        """
+        # the memberships were just changed, which keeps them from being
+        # cached for a while
+        cache.clear()
+        self.login(self.user)
+        for index in range(2):
+            connection.use_debug_cursor = True
+            reset_queries()
+            try:
+                resp = getattr(self.client, self.budget_method)(
+                    self.get_url(), data=self.get_budget_data())
+                if resp.streaming:
+                    ''.join(resp.streaming_content)
+                count = len(connection.queries)
+            finally:
+                connection.use_debug_cursor = False
+            self.assertIn(resp.status_code, (200, 302), msg=(
+                'The view should be callable to measure its queries.'))
+        return count
+
+    def grow_data(self):
+        """
+        Adds members, tasks and assignments to all lists of ``self.user``
+        and adds more lists and templates to the user.
+
+        """
+        for task_list in TaskList.objects.filter(users=self.user):
+            members = UserFactory.create_batch(3)
+            task_list.users.add(*members)
+            for task in TaskFactory.create_batch(5, task_list=task_list):
+                task.assigned_to.add(*members[:2])
+        for index in range(3):
+            for is_template in (False, True):
+                task_list = TaskListFactory(is_template=is_template)
+                task_list.users.add(self.user, UserFactory())
+                TaskFactory.create_batch(3, task_list=task_list)
+
+    def test_query_budget(self):
+        queries = self.count_queries()
+        self.assertLessEqual(queries, self.query_budget, msg=(
+            'The view should stay within its query budget.'))
+        self.grow_data()
+        self.assertEqual(self.count_queries(), queries, msg=(
+            'The number of queries should not grow with the data.'))
+
+
 # =====
 # Tests
 # =====
 
 
-class TaskCreateViewTestCase(PatchedViewTestMixin, TestCase):
+class TaskBulkDoneToggleViewTestCase(QueryBudgetViewTestMixin, TestCase):
+    """Tests for the ``TaskBulkDoneToggleView`` view class."""
+    longMessage = True
+    budget_method = 'post'
+    query_budget = 4
+
+    def get_budget_data(self):
+        # the tasks of one list are toggled, like on the page of a list
+        return {'tasks': [task.pk for task in Task.objects.filter(
+            task_list=self.task.task_list)], 'is_done': 'true'}
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.task = TaskFactory()
+        self.task.task_list.users.add(self.user)
+
+    def get_view_name(self):
+        return 'task_bulk_toggle'
+
+    def test_view(self):
+        """Test for the ``TaskBulkDoneToggleView`` view class."""
+        self.should_redirect_to_login_when_anonymous()
+        next_url = reverse('task_list', kwargs={
+            'task_list_pk': self.task.task_list.pk})
+        self.is_callable(user=self.user, method='post', data={
+            'next': next_url}, and_redirects_to=next_url, message=(
+                'With invalid data, the view should redirect to next.'))
+        self.is_callable(method='post', data={
+            'tasks': [self.task.pk], 'is_done': 'true'},
+            and_redirects_to=reverse('task_list_list'))
+        self.assertTrue(Task.objects.get().is_done, msg=(
+            'After the view is called, the task should be done.'))
+
+
+class TaskCreateViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TaskCreateView`` view class."""
     longMessage = True
+    query_budget = 5
 
     def get_view_name(self):
         return 'task_create'
@@ -55,6 +164,8 @@ class TaskCreateViewTestCase(PatchedViewTestMixin, TestCase):
                 'obj_pk': self.parent.object_id}
 
     def setUp(self):
+        # the permissions on the content objects are cached
+        cache.clear()
         self.user = UserFactory()
         self.task_list = TaskListFactory()
         self.task_list.users.add(self.user)
@@ -74,9 +185,10 @@ class TaskCreateViewTestCase(PatchedViewTestMixin, TestCase):
         self.is_not_callable(user=UserFactory())
 
 
-class TaskDeleteViewTestCase(PatchedViewTestMixin, TestCase):
+class TaskDeleteViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests or the ``TaskDeleteView`` view class."""
     longMessage = True
+    query_budget = 5
 
     def setUp(self):
         self.user = UserFactory()
@@ -100,9 +212,14 @@ class TaskDeleteViewTestCase(PatchedViewTestMixin, TestCase):
                              'task_list_pk': self.task.task_list.pk}))
 
 
-class TaskDoneToggleViewTestCase(PatchedViewTestMixin, TestCase):
+class TaskDoneToggleViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TaskDoneToggleView`` view class."""
     longMessage = True
+    budget_method = 'post'
+    query_budget = 7
+
+    def get_budget_data(self):
+        return {'task': self.task.pk}
 
     def setUp(self):
         self.user = UserFactory()
@@ -125,9 +242,10 @@ class TaskDoneToggleViewTestCase(PatchedViewTestMixin, TestCase):
         self.is_callable(method='post', data={'task': self.task.pk})
 
 
-class TaskListCreateViewTestCase(PatchedViewTestMixin, TestCase):
+class TaskListCreateViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TaskListCreateView`` view class."""
     longMessage = True
+    query_budget = 5
 
     def get_view_name(self):
         return 'task_list_create'
@@ -136,6 +254,8 @@ class TaskListCreateViewTestCase(PatchedViewTestMixin, TestCase):
         return {'ctype_pk': self.ctype_pk, 'obj_pk': self.obj_pk}
 
     def setUp(self):
+        # the permissions on the content objects are cached
+        cache.clear()
         self.user = UserFactory()
         self.ctype_pk = ContentType.objects.get_for_model(DummyModel).pk
         self.obj_pk = DummyModelFactory(user=self.user).pk
@@ -152,9 +272,10 @@ class TaskListCreateViewTestCase(PatchedViewTestMixin, TestCase):
         self.is_callable(method='post', data={})
 
 
-class TaskListDeleteViewTestCase(PatchedViewTestMixin, TestCase):
+class TaskListDeleteViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests or the ``TaskListDeleteView`` view class."""
     longMessage = True
+    query_budget = 4
 
     def setUp(self):
         self.user = UserFactory()
@@ -177,11 +298,14 @@ class TaskListDeleteViewTestCase(PatchedViewTestMixin, TestCase):
                          and_redirects_to=reverse('task_list_list'))
 
 
-class TaskListListViewTestCase(PatchedViewTestMixin, TestCase):
+class TaskListListViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests fo the ``TaskListListView`` view class."""
     longMessage = True
+    query_budget = 6
 
     def setUp(self):
+        # the permissions on the content objects are cached
+        cache.clear()
         self.user = UserFactory()
         self.task_list = TaskListFactory()
         self.task_list.users.add(self.user)
@@ -199,10 +323,83 @@ class TaskListListViewTestCase(PatchedViewTestMixin, TestCase):
         self.should_be_callable_when_authenticated(self.user)
         self.is_not_callable(kwargs={'ctype_pk': 999, 'obj_pk': 1234})
 
+    def test_content_object(self):
+        parent = ParentFactory(content_object__user=self.user)
+        parent.task_list.users.add(self.user)
+        self.login(self.user)
+        resp = self.client.get(self.get_url(view_kwargs={
+            'ctype_pk': parent.content_type.pk, 'obj_pk': parent.object_id}))
+        self.assertEqual(list(resp.context['object_list']),
+                         [parent.task_list], msg=(
+                             'Only the lists of the object should be shown.'))
+        resp = self.client.get(self.get_url(view_kwargs={}))
+        self.assertEqual(list(resp.context['object_list']), [self.task_list],
+                         msg='Only the lists without object should be shown.')
+
+    def test_counts(self):
+        TaskFactory(task_list=self.task_list, is_done=date(2013, 1, 1))
+        TaskFactory(task_list=self.task_list, due_date=date(2013, 1, 1))
+        TaskFactory(task_list=self.task_list)
+        TaskFactory(task_list=self.task_list, due_date=date(2013, 1, 1),
+                    is_done=date(2013, 1, 2))
+        empty_list = TaskListFactory(title='zzz')
+        empty_list.users.add(self.user)
+        self.login(self.user)
+        url = self.get_url(view_kwargs={})
+
+        with self.assertNumQueries(4):
+            resp = self.client.get(url)
+        task_list, empty_list = resp.context['object_list']
+        self.assertEqual(
+            (task_list.task_count, task_list.open_count,
+             task_list.done_count, task_list.overdue_count), (4, 2, 2, 1),
+            msg='The list should be annotated with its task counts.')
+        self.assertEqual(
+            (empty_list.task_count, empty_list.open_count,
+             empty_list.done_count, empty_list.overdue_count), (0, 0, 0, 0),
+            msg='A list without tasks should have no counts.')
+
+        for task_list in TaskListFactory.create_batch(5):
+            task_list.users.add(self.user)
+            TaskFactory.create_batch(2, task_list=task_list)
+        # the number of queries should not grow with the lists
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+
+class TaskListListAPIViewTestCase(QueryBudgetViewTestMixin, TestCase):
+    """Tests for the ``TaskListListAPIView`` view class."""
+    longMessage = True
+    query_budget = 4
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.task = TaskFactory()
+        self.task_list = self.task.task_list
+        self.task_list.users.add(self.user)
+        TaskListFactory()
+
+    def get_view_name(self):
+        return 'task_list_api_list'
 
-class TaskListUpdateViewTestCase(PatchedViewTestMixin, TestCase):
+    def test_view(self):
+        self.should_redirect_to_login_when_anonymous()
+        self.should_be_callable_when_authenticated(self.user)
+        resp = self.client.get(self.get_url())
+        self.assertEqual(resp['Content-Type'], 'application/json', msg=(
+            'The view should return JSON.'))
+        data = json.loads(''.join(resp.streaming_content))
+        self.assertEqual(len(data), 1, msg=(
+            'Only the lists of the user should be returned.'))
+        self.assertEqual(data[0]['id'], self.task_list.pk)
+        self.assertEqual(data[0]['task_count'], 1, msg=(
+            'The lists should contain their task counts.'))
+
+
+class TaskListUpdateViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TaskListCreateView`` view class."""
     longMessage = True
+    query_budget = 6
 
     def get_view_name(self):
         return 'task_list_update'
@@ -228,10 +425,28 @@ class TaskListUpdateViewTestCase(PatchedViewTestMixin, TestCase):
         self.is_not_callable(user=UserFactory(), message=(
             'The view should not be callable by other users.'))
 
-
-class TaskListViewTestCase(PatchedViewTestMixin, TestCase):
+    def test_add_user(self):
+        new_user = UserFactory(username='newbie')
+        self.login(self.user)
+        data = json.loads(self.client.get(
+            reverse('task_list_api_users'), data={'q': 'newbie'}).content)
+        self.assertEqual(
+            [item['id'] for item in data['results']], [new_user.pk], msg=(
+                'The autocomplete of the form should find the new user.'))
+        resp = self.client.post(self.get_url(), data={
+            'title': self.task_list.title,
+            'users': [self.user.pk, new_user.pk]})
+        self.assertEqual(resp.status_code, 302, msg=(
+            'The form should accept users, who are not yet members.'))
+        self.assertEqual(
+            set(self.task_list.users.all()), {self.user, new_user}, msg=(
+                'The new user should have been added to the list.'))
+
+
+class TaskListViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TaskListView`` view class."""
     longMessage = True
+    query_budget = 4
 
     def get_view_name(self):
         return 'task_list'
@@ -249,10 +464,176 @@ class TaskListViewTestCase(PatchedViewTestMixin, TestCase):
         self.should_be_callable_when_authenticated(self.user)
         self.is_not_callable(user=UserFactory())
 
+    def get_cached_rows(self, data=None):
+        """Requests the list and returns the keys of the cached rows."""
+        with patch.object(cache, 'set', wraps=cache.set) as set_mock:
+            self.client.get(self.get_url(), data=data or {})
+        return [args[0] for args, kwargs in set_mock.call_args_list
+                if args[0].startswith('template.cache.task_list_rows')]
+
+    def test_row_cache(self):
+        self.login(self.user)
+        self.assertEqual(self.get_cached_rows(), [], msg=(
+            'The rows of a recently changed list should not be cached,'
+            ' because the change might not be committed yet.'))
+
+        cache.clear()
+        self.login(self.user)
+        self.assertEqual(len(self.get_cached_rows({'foo': 'bar'})), 1)
+        self.assertEqual(self.get_cached_rows({'foo': 'baz'}), [], msg=(
+            'The rows should not be cached by the query string.'))
+
+        resp = self.client.get(self.get_url())
+        self.assertContains(resp, self.task.title)
+
+        Task.objects.filter(pk=self.task.pk).update(title='changed')
+        resp = self.client.get(self.get_url())
+        self.assertNotContains(resp, 'changed', msg_prefix=(
+            'Without a signal, the rows should be rendered from the cache.'))
+
+        TaskFactory(task_list=self.task.task_list, title='new task')
+        resp = self.client.get(self.get_url())
+        self.assertContains(resp, 'changed', msg_prefix=(
+            'Saving a task should invalidate the cached rows of its list.'))
+        self.assertContains(resp, 'new task')
+
+    @patch('task_list.views.TaskListView.paginate_by', 2)
+    def test_pagination(self):
+        TaskFactory.create_batch(2, task_list=self.task.task_list)
+        self.login(self.user)
+        resp = self.client.get(self.get_url())
+        page = resp.context['page_obj']
+        self.assertEqual(len(page.object_list), 2, msg=(
+            'The first page should show two tasks.'))
+        self.assertTrue(page.has_next(), msg=(
+            'The first page should have a next page.'))
+
+        resp = self.client.get(self.get_url(), data={
+            'after': page.next_cursor})
+        self.assertEqual(len(resp.context['page_obj'].object_list), 1, msg=(
+            'The second page should show the last task.'))
+        self.is_not_callable(data={'after': 'foo'}, message=(
+            'An invalid cursor should raise a 404.'))
+
+
+class TaskListAPIViewTestCase(QueryBudgetViewTestMixin, TestCase):
+    """Tests for the ``TaskListAPIView`` view class."""
+    longMessage = True
+    query_budget = 6
+
+    def get_view_name(self):
+        return 'task_list_api'
+
+    def get_view_kwargs(self):
+        return {'task_list_pk': self.task.task_list.pk,
+                'ctype_pk': self.parent.content_type.pk,
+                'obj_pk': self.parent.object_id}
+
+    def setUp(self):
+        # the permissions on the content objects are cached
+        cache.clear()
+        self.user = UserFactory()
+        self.task = TaskFactory(due_date=date(2013, 1, 1))
+        TaskFactory(task_list=self.task.task_list)
+        self.task.task_list.users.add(self.user)
+        self.parent = ParentFactory(task_list=self.task.task_list,
+                                    content_object__user=self.user)
+
+    def test_view(self):
+        self.should_redirect_to_login_when_anonymous()
+        self.should_be_callable_when_authenticated(self.user)
+        resp = self.client.get(self.get_url())
+        data = json.loads(''.join(resp.streaming_content))
+        self.assertEqual(len(data), 2, msg=(
+            'All tasks of the list should be returned.'))
+        task = [item for item in data if item['id'] == self.task.pk][0]
+        self.assertEqual(task['title'], self.task.title)
+        self.assertEqual(task['due_date'], '2013-01-01')
+        self.is_not_callable(user=UserFactory(), message=(
+            'Users without access to the list should get a 404.'))
+        self.is_not_callable(user=self.user, kwargs={
+            'task_list_pk': self.task.task_list.pk,
+            'ctype_pk': self.parent.content_type.pk,
+            'obj_pk': DummyModelFactory().pk}, message=(
+                'Users without access to the object should get a 404.'))
+
 
-class TaskUpdateViewTestCase(PatchedViewTestMixin, TestCase):
+class TaskListArchiveViewTestCase(QueryBudgetViewTestMixin, TestCase):
+    """Tests for the ``TaskListArchiveView`` view class."""
+    longMessage = True
+    query_budget = 4
+
+    def get_view_name(self):
+        return 'task_list_archive'
+
+    def get_view_kwargs(self):
+        return {'task_list_pk': self.task_list.pk}
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.task_list = TaskListFactory()
+        self.task_list.users.add(self.user)
+        self.archived_task = ArchivedTaskFactory(task_list=self.task_list)
+        ArchivedTaskFactory()
+
+    def grow_data(self):
+        super(TaskListArchiveViewTestCase, self).grow_data()
+        ArchivedTaskFactory.create_batch(5, task_list=self.task_list)
+
+    def test_view(self):
+        self.should_redirect_to_login_when_anonymous()
+        resp = self.should_be_callable_when_authenticated(self.user)
+        self.assertEqual(
+            list(resp.context['object_list']), [self.archived_task], msg=(
+                'Only the archived tasks of the list should be shown.'))
+        self.is_not_callable(user=UserFactory(), message=(
+            'Users without access to the list should get a 404.'))
+
+
+class TaskSearchViewTestCase(QueryBudgetViewTestMixin, TestCase):
+    """Tests for the ``TaskSearchView`` view class."""
+    longMessage = True
+    query_budget = 4
+
+    def get_budget_data(self):
+        return {'q': 'order'}
+
+    def setUp(self):
+        # the permissions on the content objects are cached
+        cache.clear()
+        self.user = UserFactory()
+        self.task = TaskFactory(title='Order flowers')
+        self.task.task_list.users.add(self.user)
+        TaskFactory(title='Order cake')
+        parent = ParentFactory(content_object__user=self.user)
+        parent.task_list.users.add(self.user)
+        self.object_task = TaskFactory(
+            task_list=parent.task_list, title='Order music')
+        self.object_kwargs = {
+            'ctype_pk': parent.content_type.pk, 'obj_pk': parent.object_id}
+
+    def get_view_name(self):
+        return 'task_search'
+
+    def test_view(self):
+        self.should_redirect_to_login_when_anonymous()
+        resp = self.should_be_callable_when_authenticated(self.user)
+        self.assertEqual(list(resp.context['object_list']), [], msg=(
+            'Without a search term, no task should be found.'))
+        resp = self.client.get(self.get_url(), data={'q': 'order'})
+        self.assertEqual(list(resp.context['object_list']), [self.task],
+                         msg='Only the tasks of the user should be found.')
+        resp = self.client.get(
+            self.get_url(view_kwargs=self.object_kwargs), data={'q': 'order'})
+        self.assertEqual(
+            list(resp.context['object_list']), [self.object_task], msg=(
+                'Only the tasks of the content object should be found.'))
+
+
+class TaskUpdateViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TaskUpdateView`` view class."""
     longMessage = True
+    query_budget = 7
 
     def get_view_name(self):
         return 'task_update'
@@ -278,9 +659,10 @@ class TaskUpdateViewTestCase(PatchedViewTestMixin, TestCase):
         self.is_not_callable(user=UserFactory())
 
 
-class TemplateDeleteViewTestCase(PatchedViewTestMixin, TestCase):
+class TemplateDeleteViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests or the ``TemplateDeleteView`` view class."""
     longMessage = True
+    query_budget = 4
 
     def setUp(self):
         self.user = UserFactory()
@@ -303,24 +685,27 @@ class TemplateDeleteViewTestCase(PatchedViewTestMixin, TestCase):
                          and_redirects_to=reverse('template_list'))
 
 
-class TemplateListViewTestCase(PatchedViewTestMixin, TestCase):
+class TemplateListViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TemplateListView`` view class."""
     longMessage = True
+    query_budget = 3
 
     def get_view_name(self):
         return 'template_list'
 
     def setUp(self):
         self.user = UserFactory()
+        TaskListFactory(is_template=True).users.add(self.user)
 
     def test_view(self):
         self.should_redirect_to_login_when_anonymous()
         self.should_be_callable_when_authenticated(self.user)
 
 
-class TemplateUpdateViewTestCase(PatchedViewTestMixin, TestCase):
+class TemplateUpdateViewTestCase(QueryBudgetViewTestMixin, TestCase):
     """Tests for the ``TemplateUpdateView`` view class."""
     longMessage = True
+    query_budget = 4
 
     def get_view_name(self):
         return 'template_update'
@@ -349,3 +734,73 @@ class TemplateUpdateViewTestCase(PatchedViewTestMixin, TestCase):
         self.is_callable(method='post', data={})
         self.is_not_callable(user=UserFactory(), message=(
             'The view should not be callable by other users.'))
+
+        save_mock.return_value = None
+        self.login(self.user)
+        resp = self.client.post(self.get_url(), data={})
+        self.assertEqual(resp.status_code, 200, msg=(
+            'If the template cannot be saved, the form should be shown.'))
+
+
+class UserAutocompleteViewTestCase(QueryBudgetViewTestMixin, TestCase):
+    """Tests for the ``UserAutocompleteView`` view class."""
+    longMessage = True
+    query_budget = 4
+
+    def get_view_name(self):
+        return 'task_list_api_users'
+
+    def get_view_kwargs(self):
+        return {'task_list_pk': self.task_list.pk}
+
+    def setUp(self):
+        self.user = UserFactory(username='anna')
+        self.task_list = TaskListFactory()
+        self.task_list.users.add(self.user)
+        self.members = [UserFactory(username='bob{0}'.format(index))
+                        for index in range(3)]
+        self.task_list.users.add(*self.members)
+        self.other_user = UserFactory(username='bobby')
+
+    def get_data(self, kwargs=None, **data):
+        resp = self.client.get(self.get_url(view_kwargs=kwargs), data=data)
+        return json.loads(resp.content)
+
+    def test_view(self):
+        self.should_redirect_to_login_when_anonymous()
+        self.should_be_callable_when_authenticated(self.user)
+        data = self.get_data(q='BOB', limit=2)
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [self.members[0].pk, self.members[1].pk], msg=(
+                'The members, whose username starts with the search term,'
+                ' should be returned up to the limit.'))
+        data = self.get_data(q='bob', limit=2, after=data['next'])
+        self.assertEqual(data, {
+            'results': [{'id': self.members[2].pk, 'text': 'bob2'}],
+            'next': None}, msg=(
+                'The next page should contain the remaining members.'))
+        other_task_list = TaskListFactory()
+        other_task_list.users.add(self.user, self.other_user)
+        stranger = UserFactory(username='bobcat')
+        data = self.get_data(kwargs={}, q='bob', limit=100)
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [item.pk for item in self.members] + [self.other_user.pk], msg=(
+                'Without a list, the users of all lists of the user should be'
+                ' searched.'))
+        self.assertNotIn(stranger.pk, [item['id'] for item in data['results']],
+                         msg=('Users, who share no list with the user, should'
+                              ' not be found.'))
+        data = self.get_data(kwargs={}, q='BobCat')
+        self.assertEqual(
+            [item['id'] for item in data['results']], [stranger.pk], msg=(
+                'Users, who share no list with the user, should be found by'
+                ' their full username.'))
+        # the session and the user are loaded before the search
+        with self.assertNumQueries(3):
+            self.get_data(kwargs={}, q='bob')
+        self.is_not_callable(user=self.other_user, message=(
+            'Users without access to the list should get a 404.'))
+        self.is_not_callable(data={'after': 'foo'}, message=(
+            'An invalid cursor should raise a 404.'))
@@ -0,0 +1,171 @@
+"""Tests for the management commands of the ``task_list`` app."""
+from datetime import date, timedelta
+from StringIO import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils.timezone import now
+
+from ..models import ArchivedTask, Parent, Task, TaskList
+from ..search import get_search_backend
+from .factories import DummyModelFactory, TaskFactory, TaskListFactory
+from .test_app.models import DummyModel
+
+
+class ArchiveDoneTasksTestCase(TestCase):
+    """Tests for the ``archive_done_tasks`` management command."""
+    longMessage = True
+
+    def test_command(self):
+        old_tasks = TaskFactory.create_batch(3, is_done=date(2013, 1, 1))
+        recent_task = TaskFactory(is_done=now().date() - timedelta(days=2))
+        open_task = TaskFactory()
+        stdout = StringIO()
+        call_command('archive_done_tasks', days=30, chunk_size=2,
+                     stdout=stdout)
+        self.assertIn('Archived 3 tasks.', stdout.getvalue(), msg=(
+            'The command should report the archived tasks.'))
+        self.assertEqual(
+            sorted(ArchivedTask.objects.values_list('pk', flat=True)),
+            [task.pk for task in old_tasks], msg=(
+                'The tasks done before the given days should be archived.'))
+        self.assertEqual(
+            sorted(Task.objects.values_list('pk', flat=True)),
+            [recent_task.pk, open_task.pk], msg=(
+                'Recently done and open tasks should be kept.'))
+        self.assertRaises(CommandError, call_command, 'archive_done_tasks',
+                          chunk_size=0)
+
+    def test_large_chunk(self):
+        task_list = TaskListFactory()
+        Task.objects.bulk_create([
+            Task(task_list=task_list, title='task{0}'.format(index),
+                 is_done=date(2013, 1, 1)) for index in range(1200)])
+        connection.use_debug_cursor = True
+        try:
+            call_command('archive_done_tasks', chunk_size=1200,
+                         stdout=StringIO())
+            # SQLite allows at most 999 parameters in one statement
+            self.assertFalse([
+                query['sql'] for query in connection.queries
+                if query['sql'].count(',') >= 999], msg=(
+                    'No query should have more parameters than SQLite'
+                    ' allows.'))
+        finally:
+            connection.use_debug_cursor = None
+        self.assertEqual(ArchivedTask.objects.count(), 1200, msg=(
+            'All tasks of the chunk should be archived.'))
+        self.assertFalse(Task.objects.exists())
+
+
+class GenerateTaskDataTestCase(TestCase):
+    """Tests for the ``generate_task_data`` management command."""
+    longMessage = True
+
+    def generate(self, **options):
+        options = dict({
+            'users': 5, 'lists': 10, 'templates': 2, 'tasks': 200,
+            'categories': 3, 'seed': 1, 'chunk_size': 30,
+            'host_model': 'test_app.DummyModel', 'stdout': StringIO()},
+            **options)
+        call_command('generate_task_data', **options)
+        return options['stdout'].getvalue()
+
+    def get_lists(self, queryset):
+        return list(queryset.order_by('pk').values_list(
+            'title', 'is_template', 'task_count', 'done_count'))
+
+    def test_command(self):
+        DummyModelFactory.create_batch(3)
+        self.assertIn('200 tasks', self.generate(), msg=(
+            'The command should report the created rows.'))
+        self.assertEqual(User.objects.filter(
+            username__startswith='synthetic').count(), 5)
+        self.assertEqual(TaskList.objects.filter(is_template=False).count(),
+                         10)
+        self.assertEqual(Task.objects.count(), 200)
+        self.assertEqual(
+            TaskList.objects.filter(is_template=True, template_owner=None,
+                                    ).count(), 0, msg=(
+                'Every template should have an owner.'))
+        self.assertFalse(Task.objects.filter(
+            task_list__is_template=True, is_done__isnull=False).exists(),
+            msg='The tasks of templates should not be done.')
+        self.assertFalse(TaskList.objects.filter(users=None).exists(), msg=(
+            'Every list should have a member.'))
+        self.assertEqual(
+            sorted(Parent.objects.values_list(
+                'task_list', 'content_type', 'object_id')),
+            sorted(TaskList.objects.exclude(object_id=None).values_list(
+                'pk', 'content_type', 'object_id')), msg=(
+                'The bindings should be copied to the lists.'))
+        self.assertTrue(set(Parent.objects.values_list(
+            'object_id', flat=True)) <= set(DummyModel.objects.values_list(
+                'pk', flat=True)), msg=(
+            'The lists should be bound to objects of the host model.'))
+        members = set(TaskList.users.through.objects.values_list(
+            'tasklist', 'user'))
+        self.assertTrue(set(Task.assigned_to.through.objects.values_list(
+            'task__task_list', 'user')) <= members, msg=(
+            'Tasks should only be assigned to members of their list.'))
+        stdout = StringIO()
+        call_command('rebuild_task_counts', stdout=stdout)
+        self.assertIn('fixed 0', stdout.getvalue(), msg=(
+            'The counters of the lists should be stored right away.'))
+
+        lists = self.get_lists(TaskList.objects.all())
+        last_pk = TaskList.objects.order_by('-pk')[0].pk
+        self.generate()
+        self.assertEqual(
+            self.get_lists(TaskList.objects.filter(pk__gt=last_pk)), lists,
+            msg='The same seed should create the same data.')
+        self.assertEqual(User.objects.filter(
+            username__startswith='synthetic').count(), 10, msg=(
+            'Running the command again should create new users.'))
+
+        self.assertRaises(CommandError, self.generate, host_model='foo.Bar')
+        self.assertRaises(CommandError, self.generate, lists=0)
+
+
+class RebuildTaskCountsTestCase(TestCase):
+    """Tests for the ``rebuild_task_counts`` management command."""
+    longMessage = True
+
+    def test_command(self):
+        task_list = TaskListFactory()
+        TaskFactory(task_list=task_list)
+        TaskFactory(task_list=task_list, is_done=date(2013, 1, 1))
+        empty_list = TaskListFactory()
+        TaskListFactory()
+        TaskList.objects.filter(pk=task_list.pk).update(
+            task_count=5, done_count=0)
+        TaskList.objects.filter(pk=empty_list.pk).update(
+            task_count=1, done_count=1)
+        stdout = StringIO()
+        call_command('rebuild_task_counts', chunk_size=2, stdout=stdout)
+        self.assertEqual(
+            TaskList.objects.filter(pk=task_list.pk).values_list(
+                'task_count', 'done_count')[0], (2, 1), msg=(
+                'The counters should be rebuilt from the tasks.'))
+        self.assertEqual(
+            TaskList.objects.filter(pk=empty_list.pk).values_list(
+                'task_count', 'done_count')[0], (0, 0), msg=(
+                'The counters of a list without tasks should be reset.'))
+        self.assertIn('Checked 3 task lists, fixed 2.', stdout.getvalue(),
+                      msg='The command should report the fixed lists.')
+
+
+class RebuildTaskSearchIndexTestCase(TestCase):
+    """Tests for the ``rebuild_task_search_index`` management command."""
+    longMessage = True
+
+    def test_command(self):
+        task = TaskFactory(title='Order flowers')
+        backend = get_search_backend()
+        backend.remove_tasks([task.pk])
+        call_command('rebuild_task_search_index')
+        self.assertEqual(
+            list(backend.search(Task.objects.all(), 'flowers')), [task],
+            msg='The command should add all tasks to the index.')
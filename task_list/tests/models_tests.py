@@ -1,10 +1,20 @@
 """Tests for the models of the ``task_list`` app."""
+from datetime import date
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.utils.unittest import skipUnless
 
 from django_libs.tests.factories import UserFactory
 
-from ..models import Task, TaskList
+from ..models import ArchivedTask, Task, TaskAttachment, TaskList
+from ..search import get_search_backend
+from ..utils import get_task_list_generation
 from .factories import (
+    ArchivedTaskAttachmentFactory,
+    ArchivedTaskFactory,
     CategoryFactory,
     ParentFactory,
     TaskAttachmentFactory,
@@ -13,6 +23,14 @@ from .factories import (
 )
 
 
+def get_query_plan(queryset):
+    """Returns the SQLite query plan of the given queryset as a string."""
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN QUERY PLAN {0}'.format(sql), params)
+    return ' '.join([row[-1] for row in cursor.fetchall()])
+
+
 class CategoryTestCase(TestCase):
     """Tests for the ``Category`` model class."""
     longMessage = True
@@ -32,6 +50,23 @@ class ParentTestCase(TestCase):
         parent = ParentFactory()
         self.assertTrue(parent.pk)
 
+    def test_content_object_is_copied(self):
+        """Test, that the content object is copied to the task list."""
+        parent = ParentFactory()
+        task_list = TaskList.objects.get(pk=parent.task_list.pk)
+        self.assertEqual(
+            (task_list.content_type, task_list.object_id),
+            (parent.content_type, parent.object_id), msg=(
+                'The content object of the parent should be copied to the'
+                ' task list.'))
+
+        parent.delete()
+        task_list = TaskList.objects.get(pk=parent.task_list.pk)
+        self.assertEqual((task_list.content_type, task_list.object_id),
+                         (None, None), msg=(
+                             'After the parent is deleted, the task list'
+                             ' should not have a content object.'))
+
 
 class TaskTestCase(TestCase):
     """Tests for the ``Task`` model class."""
@@ -42,6 +77,61 @@ class TaskTestCase(TestCase):
         task = TaskFactory()
         self.assertTrue(task.pk)
 
+    @skipUnless(connection.vendor == 'sqlite', 'Query plan is SQLite specific')
+    def test_indexes(self):
+        """Test, that the task list queries are covered by indexes."""
+        task_list = TaskListFactory()
+        plan = get_query_plan(Task.objects.filter(task_list=task_list))
+        self.assertIn('USING INDEX', plan, msg=(
+            'The tasks of a list should be read from an index.'))
+        self.assertNotIn('TEMP B-TREE', plan, msg=(
+            'The tasks of a list should not need a separate sort step.'))
+
+        plan = get_query_plan(Task.objects.filter(
+            task_list=task_list, is_done__isnull=True))
+        self.assertIn('task_list_task_open', plan, msg=(
+            'The open tasks of a list should use the partial index.'))
+        self.assertNotIn('TEMP B-TREE', plan, msg=(
+            'The open tasks of a list should not need a separate sort step.'))
+
+    def test_task_counts(self):
+        """Test, that saving and deleting tasks updates the list counters."""
+        task_list = TaskListFactory()
+        other_list = TaskListFactory()
+        task = TaskFactory(task_list=task_list)
+        TaskFactory(task_list=task_list, is_done=date(2013, 1, 1))
+
+        def get_counts(task_list):
+            return TaskList.objects.filter(pk=task_list.pk).values_list(
+                'task_count', 'done_count')[0]
+
+        self.assertEqual(get_counts(task_list), (2, 1), msg=(
+            'Creating tasks should increase the counters.'))
+        # the counters should not be updated without a change, the save and
+        # the search index need two queries each
+        with self.assertNumQueries(4):
+            task.title = 'new title'
+            task.save()
+        self.assertEqual(get_counts(task_list), (2, 1), msg=(
+            'Changing the title should not change the counters.'))
+
+        task = Task.objects.get(pk=task.pk)
+        task.is_done = date(2013, 1, 1)
+        task.save()
+        self.assertEqual(get_counts(task_list), (2, 2), msg=(
+            'Marking a task done should increase the done counter.'))
+
+        task.task_list = other_list
+        task.save()
+        self.assertEqual(get_counts(task_list), (1, 1), msg=(
+            'Moving a task should decrease the counters of the old list.'))
+        self.assertEqual(get_counts(other_list), (1, 1), msg=(
+            'Moving a task should increase the counters of the new list.'))
+
+        task.delete()
+        self.assertEqual(get_counts(other_list), (0, 0), msg=(
+            'Deleting a task should decrease the counters.'))
+
 
 class TaskAttachmentTestCase(TestCase):
     """Tests for the ``TestAttachment``model class."""
@@ -60,13 +150,63 @@ class TaskListManagerTestCase(TestCase):
     def setUp(self):
         self.task_list = TaskListFactory()
         self.task = TaskFactory(task_list=self.task_list)
-        self.template = TaskListFactory(is_template=True)
-        self.template_task = TaskFactory(task_list=self.template)
         self.user = UserFactory()
         self.other_user = UserFactory()
+        self.template = TaskListFactory(is_template=True,
+                                        template_owner=self.user)
+        self.template_task = TaskFactory(task_list=self.template)
         self.task_list.users.add(self.user, self.other_user)
         self.template.users.add(self.user, self.other_user)
 
+    def test_get_accessible_pks(self):
+        """Tests for the ``get_accessible_pks`` manager method."""
+        self.assertEqual(
+            TaskList.objects.get_accessible_pks(self.user),
+            set([self.task_list.pk, self.template.pk]), msg=(
+                'Should return the ids of all lists of the user.'))
+        # the memberships were changed in the setUp and might not be committed
+        # yet, so the ids are not cached, until the invalidation expires
+        with self.assertNumQueries(1):
+            TaskList.objects.get_accessible_pks(self.user)
+        cache.clear()
+        TaskList.objects.get_accessible_pks(self.user)
+        with self.assertNumQueries(0):
+            TaskList.objects.get_accessible_pks(self.user)
+
+        other_list = TaskListFactory()
+        other_list.users.add(self.user)
+        self.assertIn(
+            other_list.pk, TaskList.objects.get_accessible_pks(self.user),
+            msg='Adding a user should invalidate the cache.')
+
+        self.user.task_lists.remove(other_list)
+        self.assertNotIn(
+            other_list.pk, TaskList.objects.get_accessible_pks(self.user),
+            msg='Removing a list from the user should invalidate the cache.')
+
+        self.task_list.users.clear()
+        self.assertEqual(
+            TaskList.objects.get_accessible_pks(self.other_user),
+            set([self.template.pk]), msg=(
+                'Clearing the users should invalidate the cache.'))
+
+        self.template.delete()
+        self.assertEqual(
+            TaskList.objects.get_accessible_pks(self.user), set(), msg=(
+                'Deleting a list should invalidate the cache.'))
+
+    def test_get_overdue_counts(self):
+        """Tests for the ``get_overdue_counts`` manager method."""
+        TaskFactory(task_list=self.task_list, due_date=date(2013, 1, 1))
+        TaskFactory(task_list=self.task_list, due_date=date(2013, 1, 1),
+                    is_done=date(2013, 1, 2))
+        TaskFactory(task_list=self.task_list, due_date=date(2013, 2, 1))
+        self.assertEqual(
+            TaskList.objects.get_overdue_counts(
+                TaskList.objects.all(), date(2013, 1, 15)),
+            {self.task_list.pk: 1}, msg=(
+                'Should count the open tasks due before the date per list.'))
+
     def test_create_template_from_task_list(self):
         """Tests for the ``create_template_from_task_list`` manager method."""
         template = TaskList.objects.create_template_from_task_list(
@@ -81,10 +221,41 @@ class TaskListManagerTestCase(TestCase):
             'Task list should be a template.'))
         self.assertEqual(template.users.count(), 1, msg=(
             'The template should only have 1 user assigned.'))
+        self.assertEqual(template.template_owner, self.user, msg=(
+            'The user should own the template.'))
         self.assertEqual(template.tasks.count(), 1, msg=(
             'The template should have one task.'))
+        self.assertRaises(
+            IntegrityError, TaskList.objects.create_template_from_task_list,
+            self.task_list, self.user)
+
+        self.task_list.title = 'Second template'
+        self.task.assigned_to.add(self.user)
+        self.task.due_date = date(2013, 1, 1)
+        self.task.is_done = date(2013, 1, 2)
+        self.task.save()
+        template = TaskList.objects.create_template_from_task_list(
+            self.task_list, self.user)
+        template_task = template.tasks.get()
+        self.assertEqual(template_task.assigned_to.count(), 0, msg=(
+            'The tasks of the template should not be assigned to anyone.'))
+        self.assertIsNone(template_task.due_date, msg=(
+            'The tasks of the template should have no due date.'))
+        self.assertIsNone(template_task.is_done, msg=(
+            'The tasks of the template should not be done.'))
+        self.assertEqual(
+            TaskList.objects.filter(pk=template.pk).values_list(
+                'task_count', 'done_count')[0], (1, 0), msg=(
+                'The template should count its own tasks.'))
+
+        TaskFactory.create_batch(50, task_list=self.task_list)
+        self.task_list.title = 'Third template'
+        # the number of queries should not grow with the task list
+        with self.assertNumQueries(8):
+            TaskList.objects.create_template_from_task_list(
+                self.task_list, self.user)
 
-    def create_from_template(self):
+    def test_create_from_template(self):
         """Tests for the ``create_from_template`` manager method."""
         task_list = TaskList.objects.create_from_template(
             self.template, 'new', self.user)
@@ -96,11 +267,36 @@ class TaskListManagerTestCase(TestCase):
             ' database.'))
         self.assertFalse(task_list.is_template, msg=(
             'Task list should not be a template.'))
+        self.assertIsNone(task_list.template_owner, msg=(
+            'The task list should have no template owner.'))
         self.assertEqual(task_list.users.count(), 1, msg=(
             'The task list should still have 1 user assigned.'))
         self.assertEqual(task_list.tasks.count(), 1, msg=(
             'The task list should have one task.'))
 
+        self.template_task.assigned_to.add(self.user, self.other_user)
+        task_list = TaskList.objects.create_from_template(
+            self.template, 'new', self.user)
+        self.assertEqual(
+            list(task_list.tasks.get().assigned_to.all()), [self.user], msg=(
+                'Only the assignments of the creating user should be copied.'))
+        self.assertEqual(
+            (task_list.task_count, task_list.done_count), (1, 0), msg=(
+                'The counters of the returned list should be set.'))
+        self.assertEqual(
+            TaskList.objects.filter(pk=task_list.pk).values_list(
+                'task_count', 'done_count')[0], (1, 0), msg=(
+                'The task list should count the copied tasks.'))
+
+        with self.assertNumQueries(11):
+            TaskList.objects.create_from_template(
+                self.template, 'new', self.user)
+        TaskFactory.create_batch(50, task_list=self.template)
+        # the number of queries should not grow with the template
+        with self.assertNumQueries(11):
+            TaskList.objects.create_from_template(
+                self.template, 'new', self.user)
+
 
 class TaskListTestCase(TestCase):
     """Tests for the ``TaskList`` model class."""
@@ -110,3 +306,145 @@ class TaskListTestCase(TestCase):
         """Test instantiation of the ``TaskList`` model."""
         task_list = TaskListFactory()
         self.assertTrue(task_list.pk)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Query plan is SQLite specific')
+    def test_content_object_index(self):
+        """Test, that the lists of an object are found with an index."""
+        parent = ParentFactory()
+        for queryset in [
+                TaskList.objects.filter(object_id=None, is_template=False),
+                TaskList.objects.filter(
+                    content_type=parent.content_type,
+                    object_id=parent.object_id, is_template=False)]:
+            plan = get_query_plan(
+                queryset.order_by().values_list('pk', flat=True))
+            self.assertIn('USING COVERING INDEX', plan, msg=(
+                'The ids of the lists should be read from the index only.'))
+
+    def test_counts(self):
+        """Tests for the ``open_count`` and ``get_progress`` methods."""
+        task_list = TaskListFactory(task_count=40, done_count=12)
+        self.assertEqual(task_list.open_count, 28)
+        self.assertEqual(task_list.get_progress(), '12/40 done')
+
+    def test_delete(self):
+        """Test, that deleting a list does not cost a query per task."""
+        task_lists = []
+        for task_count in [1, 5]:
+            task_list = TaskListFactory()
+            for i in range(task_count):
+                task = TaskFactory(task_list=task_list)
+                task.assigned_to.add(UserFactory())
+                TaskAttachmentFactory(task=task)
+            task_lists.append(task_list)
+        generation = get_task_list_generation(task_lists[0].pk)
+        # the tasks with their assignments and attachments are deleted in
+        # bulk, then the list is deleted and the index is updated once
+        with self.assertNumQueries(11):
+            task_lists[0].delete()
+        with self.assertNumQueries(11):
+            task_lists[1].delete()
+        self.assertFalse(Task.objects.exists(), msg=(
+            'The tasks should be deleted with their list.'))
+        self.assertFalse(TaskAttachment.objects.exists(), msg=(
+            'The attachments should be deleted with their tasks.'))
+        self.assertFalse(Task.assigned_to.through.objects.exists(), msg=(
+            'The assignments should be deleted with their tasks.'))
+        self.assertNotEqual(
+            get_task_list_generation(task_lists[0].pk), generation, msg=(
+                'Deleting a list should invalidate its cache.'))
+
+    def test_has_member(self):
+        """Tests for the ``has_member`` method."""
+        task_list = TaskListFactory()
+        user = UserFactory()
+        task_list.users.add(user)
+        cache.clear()
+        self.assertFalse(task_list.has_member(UserFactory()), msg=(
+            'Should return False, if the user is not a member of the list.'))
+        self.assertFalse(task_list.has_member(AnonymousUser()), msg=(
+            'Should return False for anonymous users.'))
+        with self.assertNumQueries(1):
+            self.assertTrue(task_list.has_member(user), msg=(
+                'Should return True, if the user is a member of the list.'))
+        with self.assertNumQueries(0):
+            self.assertTrue(task_list.has_member(user), msg=(
+                'The second check should be answered from the cache.'))
+
+
+class ArchivedTaskManagerTestCase(TestCase):
+    """Tests for the ``ArchivedTaskManager`` custom manager."""
+    longMessage = True
+
+    def test_archive_tasks(self):
+        """Tests for the ``archive_tasks`` manager method."""
+        task_list = TaskListFactory()
+        user = UserFactory()
+        task = TaskFactory(
+            task_list=task_list, title='Order flowers',
+            category=CategoryFactory(), is_done=date(2013, 1, 1))
+        task.assigned_to.add(user)
+        attachment = TaskAttachmentFactory(task=task)
+        open_task = TaskFactory(task_list=task_list)
+        generation = get_task_list_generation(task_list.pk)
+
+        self.assertEqual(ArchivedTask.objects.archive_tasks(
+            [task.pk, open_task.pk], date(2013, 1, 2)), 1, msg=(
+                'Only the tasks done before the date should be archived.'))
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists(), msg=(
+            'The task should be removed from the task table.'))
+        archived_task = ArchivedTask.objects.get(pk=task.pk)
+        self.assertEqual(
+            [getattr(archived_task, field.attname)
+             for field in Task._meta.local_fields],
+            [getattr(task, field.attname)
+             for field in Task._meta.local_fields], msg=(
+                'The archived task should keep the fields of the task.'))
+        self.assertEqual(list(archived_task.assigned_to.all()), [user], msg=(
+            'The assignments should be archived.'))
+        self.assertEqual(
+            list(archived_task.attachments.values_list('file', flat=True)),
+            [attachment.file_id], msg='The attachments should be archived.')
+        self.assertFalse(TaskAttachment.objects.exists())
+        self.assertEqual(
+            TaskList.objects.filter(pk=task_list.pk).values_list(
+                'task_count', 'done_count')[0], (1, 0), msg=(
+                'The counters of the list should not count archived tasks.'))
+        self.assertEqual(
+            list(get_search_backend().search(Task.objects.all(), 'flowers')),
+            [], msg='The task should be removed from the search index.')
+        self.assertNotEqual(
+            get_task_list_generation(task_list.pk), generation, msg=(
+                'The cached rows of the list should be invalidated.'))
+        self.assertTrue(Task.objects.filter(pk=open_task.pk).exists(), msg=(
+            'Other tasks should be left alone.'))
+        self.assertEqual(ArchivedTask.objects.archive_tasks(
+            [task.pk], date(2013, 1, 2)), 0, msg=(
+                'Archived tasks should not be archived again.'))
+        reopened_task = TaskFactory(task_list=task_list,
+                                    is_done=date(2013, 1, 1))
+        Task.objects.filter(pk=reopened_task.pk).update(is_done=None)
+        self.assertEqual(ArchivedTask.objects.archive_tasks(
+            [reopened_task.pk], date(2013, 1, 2)), 0, msg=(
+                'Tasks reopened since their ids were selected should not be'
+                ' archived.'))
+
+
+class ArchivedTaskTestCase(TestCase):
+    """Tests for the ``ArchivedTask`` model class."""
+    longMessage = True
+
+    def test_instantiation(self):
+        """Test instantiation of the ``ArchivedTask`` model."""
+        task = ArchivedTaskFactory()
+        self.assertTrue(task.pk)
+
+
+class ArchivedTaskAttachmentTestCase(TestCase):
+    """Tests for the ``ArchivedTaskAttachment`` model class."""
+    longMessage = True
+
+    def test_instantiation(self):
+        """Test instantiation of the ``ArchivedTaskAttachment`` model."""
+        attachment = ArchivedTaskAttachmentFactory()
+        self.assertTrue(attachment.pk)
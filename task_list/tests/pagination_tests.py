@@ -0,0 +1,124 @@
+"""Tests for the pagination of the ``task_list`` app."""
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils.unittest import skipUnless
+
+from mock import patch
+
+from ..models import Task
+from ..pagination import (
+    EstimatedCountPaginator,
+    KeysetPaginator,
+    get_estimated_count,
+)
+from .factories import TaskFactory, TaskListFactory
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Statistics are SQLite specific')
+class EstimatedCountPaginatorTestCase(TransactionTestCase):
+    """Tests for the ``EstimatedCountPaginator`` class."""
+    longMessage = True
+
+    def setUp(self):
+        self.task_list = TaskListFactory()
+        TaskFactory.create_batch(5, task_list=self.task_list)
+        # ANALYZE commits the running transaction, hence TransactionTestCase
+        connection.cursor().execute('ANALYZE')
+        TaskFactory.create_batch(2, task_list=self.task_list)
+
+    def tearDown(self):
+        # the statistics would change the query plans of the other tests
+        cursor = connection.cursor()
+        cursor.execute('DELETE FROM sqlite_stat1')
+        cursor.execute('ANALYZE sqlite_master')
+
+    def test_get_estimated_count(self):
+        """Tests for the ``get_estimated_count`` function."""
+        self.assertEqual(get_estimated_count(Task), 5, msg=(
+            'Should return the number of rows of the last ANALYZE.'))
+
+    def test_count(self):
+        """Tests for the ``count`` property."""
+        queryset = Task.objects.all()
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 7, msg=(
+            'Without a threshold, the objects should be counted.'))
+        with patch('task_list.pagination.app_settings.'
+                   'ESTIMATED_COUNT_THRESHOLD', 5):
+            self.assertEqual(
+                EstimatedCountPaginator(queryset, 10).count, 5, msg=(
+                    'Above the threshold, the estimate should be used.'))
+            self.assertEqual(EstimatedCountPaginator(queryset.filter(
+                task_list=self.task_list), 10).count, 7, msg=(
+                'Filtered querysets should be counted.'))
+        with patch('task_list.pagination.app_settings.'
+                   'ESTIMATED_COUNT_THRESHOLD', 6):
+            self.assertEqual(
+                EstimatedCountPaginator(queryset, 10).count, 7, msg=(
+                    'Below the threshold, the objects should be counted.'))
+
+
+class KeysetPaginatorTestCase(TestCase):
+    """Tests for the ``KeysetPaginator`` class."""
+    longMessage = True
+
+    def setUp(self):
+        self.task_list = TaskListFactory()
+        for due_date in [None, date(2013, 1, 1), date(2013, 1, 2)]:
+            for priority in ['1', '3']:
+                TaskFactory.create_batch(
+                    2, task_list=self.task_list, due_date=due_date,
+                    priority=priority, title='same title')
+        self.queryset = Task.objects.filter(task_list=self.task_list)
+        self.ordering = ['due_date', 'priority', 'title', 'pk']
+        self.expected = list(self.queryset.order_by(*self.ordering))
+
+    def test_page(self):
+        """Tests for the ``page`` method."""
+        paginator = KeysetPaginator(self.queryset, 5, self.ordering)
+        page = paginator.page()
+        self.assertEqual(page.object_list, self.expected[:5], msg=(
+            'Without a cursor, the first page should be returned.'))
+        self.assertTrue(page.has_next(), msg=(
+            'The first page should have a next page.'))
+        self.assertFalse(page.has_previous(), msg=(
+            'The first page should not have a previous page.'))
+
+        pages = [page.object_list]
+        while page.has_next():
+            page = paginator.page(after=page.next_cursor)
+            pages.append(page.object_list)
+        self.assertEqual(sum(pages, []), self.expected, msg=(
+            'Following the next cursors should return all objects in order.'))
+        self.assertEqual(len(pages), 3, msg=(
+            'There should be three pages with 12 objects.'))
+        self.assertTrue(page.has_previous(), msg=(
+            'The last page should have a previous page.'))
+
+        page = paginator.page(before=page.previous_cursor)
+        self.assertEqual(page.object_list, self.expected[5:10], msg=(
+            'The previous cursor should return the page before.'))
+        self.assertTrue(page.has_previous(), msg=(
+            'The second page should have a previous page.'))
+        page = paginator.page(before=page.previous_cursor)
+        self.assertEqual(page.object_list, self.expected[:5], msg=(
+            'The previous cursor should return the first page.'))
+        self.assertFalse(page.has_previous(), msg=(
+            'The first page should not have a previous page.'))
+
+        with self.assertNumQueries(1):
+            paginator.page(after=paginator.encode_cursor(self.expected[7]))
+
+    def test_invalid_cursor(self):
+        """Test, that invalid cursors raise ``InvalidPage``."""
+        paginator = KeysetPaginator(self.queryset, 5, self.ordering)
+        self.assertRaises(InvalidPage, paginator.page, after='foo')
+        self.assertRaises(InvalidPage, paginator.page, before='W10=')
+
+    def test_ordering_must_be_unique(self):
+        """Test, that the last ordering field needs to be unique."""
+        self.assertRaises(ImproperlyConfigured, KeysetPaginator,
+                          self.queryset, 5, ['due_date', 'title'])
@@ -0,0 +1,107 @@
+"""Tests for the permission checks of the ``task_list`` app."""
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+
+from django_libs.tests.factories import UserFactory
+from mock import Mock, patch
+
+from .. import permissions
+from .factories import DummyModelFactory
+from .test_app.models import DummyModel
+
+
+class DefaultPermissionResolverTestCase(TestCase):
+    """Tests for the ``default_permission_resolver`` function."""
+    longMessage = True
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.request = Mock(user=self.user)
+        self.dummy = DummyModelFactory(user=self.user)
+        self.ctype = ContentType.objects.get_for_model(DummyModel)
+
+    def test_function(self):
+        """Tests for the ``default_permission_resolver`` function."""
+        with self.assertNumQueries(1):
+            self.assertTrue(permissions.default_permission_resolver(
+                self.request, self.ctype, self.dummy.pk), msg=(
+                    'The owner should be permitted.'))
+        self.assertFalse(permissions.default_permission_resolver(
+            Mock(user=UserFactory()), self.ctype, self.dummy.pk), msg=(
+                'Other users should not be permitted.'))
+
+        with patch.object(DummyModel, 'task_list_has_permission_for_pk',
+                          None):
+            self.assertTrue(permissions.default_permission_resolver(
+                self.request, self.ctype, self.dummy.pk), msg=(
+                    'Without the classmethod, the object should be asked.'))
+            self.assertFalse(permissions.default_permission_resolver(
+                self.request, self.ctype, 999), msg=(
+                    'Objects, that do not exist, should not be permitted.'))
+
+        self.assertFalse(permissions.default_permission_resolver(
+            self.request, ContentType.objects.get_for_model(User),
+            self.user.pk), msg=(
+                'Models without a permission method should not be permitted.'))
+
+
+class HasObjectPermissionTestCase(TestCase):
+    """Tests for the ``has_object_permission`` function."""
+    longMessage = True
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.request = Mock(user=self.user)
+        self.dummy = DummyModelFactory(user=self.user)
+        self.ctype = ContentType.objects.get_for_model(DummyModel)
+
+    def test_function(self):
+        """Tests for the ``has_object_permission`` function."""
+        self.assertTrue(permissions.has_object_permission(
+            self.request, self.ctype, self.dummy.pk), msg=(
+                'The owner should be permitted.'))
+        with self.assertNumQueries(0):
+            self.assertTrue(permissions.has_object_permission(
+                self.request, self.ctype, self.dummy.pk), msg=(
+                    'The permission should be cached.'))
+
+        self.dummy.user = UserFactory()
+        self.dummy.save()
+        permissions.invalidate_object_permissions(
+            self.ctype.pk, self.dummy.pk, user_pk=self.user.pk)
+        self.assertFalse(permissions.has_object_permission(
+            self.request, self.ctype, self.dummy.pk), msg=(
+                'After invalidating the permission of the user, it should be'
+                ' resolved again.'))
+
+        self.dummy.user = self.user
+        self.dummy.save()
+        permissions.invalidate_object_permissions(self.ctype.pk, self.dummy.pk)
+        self.assertTrue(permissions.has_object_permission(
+            self.request, self.ctype, self.dummy.pk), msg=(
+                'After invalidating all permissions of the object, it should'
+                ' be resolved again.'))
+
+    def test_new_user(self):
+        """Test, that a new user does not inherit cached permissions."""
+        self.assertTrue(permissions.has_object_permission(
+            self.request, self.ctype, self.dummy.pk))
+        user_pk, dummy_pk = self.user.pk, self.dummy.pk
+        self.user.delete()
+        self.request.user = UserFactory(pk=user_pk)
+        self.dummy = DummyModelFactory(pk=dummy_pk, user=UserFactory())
+        self.assertFalse(permissions.has_object_permission(
+            self.request, self.ctype, self.dummy.pk), msg=(
+                'A new user with the id of a deleted user should not get the'
+                ' cached permissions of the deleted user.'))
+
+    @patch.object(permissions.app_settings, 'PERMISSION_RESOLVER', 'foo.bar')
+    def test_invalid_resolver(self):
+        """Test, that a resolver, that cannot be imported, raises an error."""
+        self.assertRaises(ImproperlyConfigured,
+                          permissions.has_object_permission, self.request,
+                          self.ctype, self.dummy.pk)
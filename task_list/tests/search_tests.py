@@ -0,0 +1,146 @@
+"""Tests for the search backends of the ``task_list`` app."""
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+
+from django_libs.tests.factories import UserFactory
+from mock import patch
+
+from ..models import Task, TaskList
+from ..search import (
+    DatabaseSearchBackend,
+    SQLiteFTS5SearchBackend,
+    get_search_backend,
+)
+from .factories import CategoryFactory, TaskFactory, TaskListFactory
+
+
+class GetSearchBackendTestCase(TestCase):
+    """Tests for the ``get_search_backend`` function."""
+    longMessage = True
+
+    def test_function(self):
+        with patch('task_list.search.app_settings.SEARCH_BACKEND',
+                   'task_list.search.DatabaseSearchBackend'):
+            self.assertIsInstance(
+                get_search_backend(), DatabaseSearchBackend, msg=(
+                    'Should return an instance of the configured backend.'))
+        with patch('task_list.search.app_settings.SEARCH_BACKEND',
+                   'task_list.search.FooBackend'):
+            self.assertRaises(ImproperlyConfigured, get_search_backend)
+
+
+class SearchBackendTestCaseMixin(object):
+    """Tests, that every search backend has to pass."""
+    longMessage = True
+
+    def setUp(self):
+        self.task_list = TaskListFactory(title='Wedding')
+        self.task = TaskFactory(
+            task_list=self.task_list, title='Order flowers',
+            description='Roses and tulips',
+            category=CategoryFactory(title='Decoration'))
+        self.other_task = TaskFactory(
+            task_list=self.task_list, title='Book the band')
+
+    def search(self, search_term, queryset=None):
+        if queryset is None:
+            queryset = Task.objects.all()
+        return list(self.backend.search(queryset, search_term))
+
+    def test_search(self):
+        self.assertEqual(self.search('flowers'), [self.task], msg=(
+            'Should find the tasks by their title.'))
+        self.assertEqual(self.search('flow'), [self.task], msg=(
+            'Should find the tasks by the start of a word.'))
+        self.assertEqual(self.search('tulip'), [self.task], msg=(
+            'Should find the tasks by their description.'))
+        self.assertEqual(self.search('decoration'), [self.task], msg=(
+            'Should find the tasks by their category title.'))
+        self.assertEqual(len(self.search('wedding')), 2, msg=(
+            'Should find the tasks by the title of their list.'))
+        self.assertEqual(self.search('order roses'), [self.task], msg=(
+            'Should find the tasks, that match all words.'))
+        self.assertEqual(self.search('order band'), [], msg=(
+            'Should not find tasks, that match only some words.'))
+        self.assertEqual(self.search('wedding', Task.objects.filter(
+            pk=self.other_task.pk)), [self.other_task], msg=(
+            'Should only search the given queryset.'))
+
+    def test_index(self):
+        self.task.title = 'Order cake'
+        self.task.save()
+        self.assertEqual(self.search('cake'), [self.task], msg=(
+            'Should find a task by its new title.'))
+        self.assertEqual(self.search('flowers'), [], msg=(
+            'Should not find a task by its old title.'))
+
+        self.task.category.title = 'Catering'
+        self.task.category.save()
+        self.assertEqual(self.search('catering'), [self.task], msg=(
+            'Should find a task by the new title of its category.'))
+
+        self.task_list.title = 'Party'
+        self.task_list.save()
+        self.assertEqual(len(self.search('party')), 2, msg=(
+            'Should find the tasks by the new title of their list.'))
+
+        self.task.delete()
+        self.assertEqual(self.search('cake'), [], msg=(
+            'Should not find a deleted task.'))
+
+        self.task_list.is_template = True
+        self.task_list.save()
+        task_list = TaskList.objects.create_from_template(
+            self.task_list, 'Birthday', UserFactory())
+        self.assertEqual(
+            self.search('birthday'), list(task_list.tasks.all()), msg=(
+                'Should find the tasks copied from a template.'))
+
+
+class DatabaseSearchBackendTestCase(SearchBackendTestCaseMixin, TestCase):
+    """Tests for the ``DatabaseSearchBackend`` class."""
+    backend = DatabaseSearchBackend()
+
+
+class SQLiteFTS5SearchBackendTestCase(SearchBackendTestCaseMixin, TestCase):
+    """Tests for the ``SQLiteFTS5SearchBackend`` class."""
+    backend = SQLiteFTS5SearchBackend()
+
+    def test_quotes(self):
+        self.assertEqual(self.search('"flowers" "'), [self.task], msg=(
+            'Quotes in the search term should not break the query.'))
+
+    def test_rebuild(self):
+        """Tests for the ``rebuild`` method."""
+        self.backend.remove_tasks([self.task.pk, self.other_task.pk])
+        self.assertEqual(self.search('wedding'), [])
+        self.backend.rebuild()
+        self.assertEqual(len(self.search('wedding')), 2, msg=(
+            'After a rebuild, all tasks should be found again.'))
+
+    def test_remove_tasks(self):
+        """Tests for the ``remove_tasks`` method."""
+        self.backend.remove_tasks(range(1, 1200))
+        self.assertEqual(self.search('wedding'), [], msg=(
+            'More tasks than SQLite allows parameters should be removed.'))
+
+    def test_task_list_saved(self):
+        with patch.object(SQLiteFTS5SearchBackend,
+                          'update_task_list') as update_task_list:
+            TaskList.objects.get(pk=self.task_list.pk).save()
+            self.assertFalse(update_task_list.called, msg=(
+                'A list, whose title was not changed, should not be'
+                ' reindexed.'))
+            self.task_list.title = 'Party'
+            self.task_list.save()
+            self.task_list.save()
+            self.assertEqual(update_task_list.call_count, 1, msg=(
+                'A list should be reindexed once after its title changed.'))
+
+    def test_task_list_deleted(self):
+        self.task_list.delete()
+        cursor = connection.cursor()
+        cursor.execute('SELECT COUNT(*) FROM {0}'.format(self.backend.table))
+        self.assertEqual(cursor.fetchone()[0], 0, msg=(
+            'The tasks of a deleted list should be removed from the index.'))
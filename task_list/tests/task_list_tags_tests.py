@@ -1,7 +1,13 @@
 """Tests for the template tags of the ``task_list`` app."""
 from django.test import TestCase
 
-from ..templatetags.task_list_tags import get_ctype_url
+from django_libs.tests.factories import UserFactory
+
+from ..templatetags.task_list_tags import (
+    get_ctype_url,
+    has_member,
+    task_progress,
+)
 from .factories import TaskListFactory
 
 
@@ -21,3 +27,29 @@ class GetCtypeUrlTestCase(TestCase):
                           task_list_pk=task_list.pk),
             '/ctype/1/object/2/{0}/'.format(task_list.pk), msg=(
                 'Template tag did not return the correct url.'))
+
+
+class HasMemberTestCase(TestCase):
+    """Tests for the ``has_member`` template filter."""
+    longMessage = True
+
+    def test_filter(self):
+        """Tests for the ``has_member`` template filter."""
+        task_list = TaskListFactory()
+        user = UserFactory()
+        self.assertFalse(has_member(task_list, user), msg=(
+            'Should return False, if the user is not a member of the list.'))
+        task_list.users.add(user)
+        self.assertTrue(has_member(task_list, user), msg=(
+            'Should return True, if the user is a member of the list.'))
+
+
+class TaskProgressTestCase(TestCase):
+    """Tests for the ``task_progress`` template filter."""
+    longMessage = True
+
+    def test_filter(self):
+        """Tests for the ``task_progress`` template filter."""
+        task_list = TaskListFactory(task_count=40, done_count=12)
+        self.assertEqual(task_progress(task_list), '12/40 done', msg=(
+            'Should return the done and the total number of tasks.'))
@@ -9,3 +9,7 @@ class DummyModel(models.Model):
 
     def task_list_has_permission(self, request):
         return self.user == request.user
+
+    @classmethod
+    def task_list_has_permission_for_pk(cls, request, obj_pk):
+        return cls.objects.filter(pk=obj_pk, user=request.user).exists()
@@ -73,3 +73,6 @@ COVERAGE_MODULE_EXCLUDES += EXTERNAL_APPS
 SECRET_KEY = 'foobar'
 
 LOGIN_URL = '/login/'
+
+# the tests run on SQLite, so they can use the full-text search index
+TASK_LIST_SEARCH_BACKEND = 'task_list.search.SQLiteFTS5SearchBackend'
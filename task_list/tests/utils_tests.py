@@ -0,0 +1,108 @@
+"""Tests for the utilities of the ``task_list`` app."""
+from django.core.urlresolvers import NoReverseMatch, reverse
+from django.db import IntegrityError
+from django.test import TestCase
+
+from django_libs.tests.factories import UserFactory
+from mock import patch
+
+from .. import utils
+from ..models import TaskList
+from .factories import TaskFactory, TaskListFactory
+
+
+class AddM2MIfMissingTestCase(TestCase):
+    """Tests for the ``add_m2m_if_missing`` function."""
+    longMessage = True
+
+    def test_function(self):
+        user = UserFactory()
+        task_list = TaskListFactory()
+        self.assertEqual(
+            list(TaskList.objects.get_accessible_pks(user)), [], msg=(
+                'The accessible lists are cached before the user is added.'))
+        with self.assertNumQueries(1):
+            self.assertTrue(utils.add_m2m_if_missing(
+                task_list, 'users', user), msg=(
+                    'Should return True, if the user was added.'))
+        self.assertEqual(list(task_list.users.all()), [user])
+        self.assertTrue(task_list.has_member(user), msg=(
+            'The post_add signal should invalidate the cached lists.'))
+        with self.assertNumQueries(1):
+            self.assertFalse(utils.add_m2m_if_missing(
+                task_list, 'users', user), msg=(
+                    'Should return False, if the user was a member already.'))
+        self.assertEqual(task_list.users.count(), 1, msg=(
+            'The user should not be added twice.'))
+
+    def test_concurrent_insert(self):
+        user = UserFactory()
+        task_list = TaskListFactory()
+        with patch('task_list.utils.connections') as connections:
+            cursor = connections.__getitem__.return_value.cursor.return_value
+            cursor.execute.side_effect = IntegrityError
+            self.assertFalse(utils.add_m2m_if_missing(
+                task_list, 'users', user), msg=(
+                    'Should return False, if a concurrent request has added'
+                    ' the user first.'))
+
+
+class CachedReverseTestCase(TestCase):
+    """Tests for the ``cached_reverse`` function."""
+    longMessage = True
+
+    def test_function(self):
+        """Tests for the ``cached_reverse`` function."""
+        for url_name, kwargs in [
+                ('task_list', {'task_list_pk': 1}),
+                ('task_list', {'task_list_pk': 12}),
+                ('task_list', {'task_list_pk': 3, 'ctype_pk': 4,
+                               'obj_pk': '56'}),
+                ('task_list_list', {}),
+                ('task_update', {'pk': 7})]:
+            self.assertEqual(
+                utils.cached_reverse(url_name, kwargs),
+                reverse(url_name, kwargs=kwargs), msg=(
+                    'Should return the same url as reverse for {0}'.format(
+                        kwargs)))
+
+        with patch.object(utils, 'reverse') as reverse_mock:
+            self.assertEqual(
+                utils.cached_reverse('task_list', {'task_list_pk': 8}),
+                '/8/', msg='Should return the url from the cache.')
+            self.assertFalse(reverse_mock.called, msg=(
+                'A cached url should not be reversed again.'))
+
+        self.assertRaises(NoReverseMatch, utils.cached_reverse, 'task_list',
+                          {'task_list_pk': 'foo'})
+        self.assertRaises(NoReverseMatch, utils.cached_reverse, 'foo', {})
+
+
+class TaskListGenerationTestCase(TestCase):
+    """Tests for the generation counter of task lists."""
+    longMessage = True
+
+    def test_generation(self):
+        """Tests for the ``get_task_list_generation`` function."""
+        task = TaskFactory()
+        generation = utils.get_task_list_generation(task.task_list.pk)
+        self.assertEqual(
+            utils.get_task_list_generation(task.task_list.pk), generation,
+            msg='The generation should not change by itself.')
+
+        task.save()
+        self.assertNotEqual(
+            utils.get_task_list_generation(task.task_list.pk), generation,
+            msg='Saving a task should bump the generation of its list.')
+        generation = utils.get_task_list_generation(task.task_list.pk)
+
+        task.assigned_to.add(UserFactory())
+        self.assertNotEqual(
+            utils.get_task_list_generation(task.task_list.pk), generation,
+            msg='Assigning a task should bump the generation of its list.')
+        generation = utils.get_task_list_generation(task.task_list.pk)
+
+        task.delete()
+        self.assertNotEqual(
+            utils.get_task_list_generation(task.task_list.pk), generation,
+            msg='Deleting a task should bump the generation of its list.')
@@ -4,6 +4,7 @@ from django.conf.urls.defaults import include, patterns, url
 
 urlpatterns = patterns(
     '',
+    url(r'^api/', include('task_list.urls.api')),
     url(r'^', include('task_list.urls.simple')),
     url(r'^', include('task_list.urls.ctype')),
 )
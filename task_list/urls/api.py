@@ -0,0 +1,30 @@
+"""JSON API URLs for the ``task_list`` app."""
+from django.conf.urls.defaults import patterns, url
+
+from ..views import (
+    TaskListAPIView,
+    TaskListListAPIView,
+    UserAutocompleteView,
+)
+
+
+urlpatterns = patterns(
+    '',
+    url(r'^$', TaskListListAPIView.as_view(),
+        name='task_list_api_list'),
+    url(r'^(?P<task_list_pk>\d+)/$', TaskListAPIView.as_view(),
+        name='task_list_api'),
+    url(r'^users/$', UserAutocompleteView.as_view(),
+        name='task_list_api_users'),
+    url(r'^users/(?P<task_list_pk>\d+)/$', UserAutocompleteView.as_view(),
+        name='task_list_api_users'),
+
+    # ctype urls
+    url(r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/$',
+        TaskListListAPIView.as_view(),
+        name='task_list_api_list'),
+    url(
+        r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/(?P<task_list_pk>\d+)/$',  # NOQA
+        TaskListAPIView.as_view(),
+        name='task_list_api'),
+)
@@ -2,14 +2,17 @@
 from django.conf.urls.defaults import patterns, url
 
 from ..views import (
+    TaskBulkDoneToggleView,
     TaskCreateView,
     TaskDeleteView,
     TaskDoneToggleView,
+    TaskListArchiveView,
     TaskListCreateView,
     TaskListDeleteView,
     TaskListListView,
     TaskListUpdateView,
     TaskListView,
+    TaskSearchView,
     TaskUpdateView,
     TemplateDeleteView,
     TemplateListView,
@@ -53,10 +56,21 @@ urlpatterns = patterns(
         r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/(?P<task_list_pk>\d+)/$',  # NOQA
         TaskListView.as_view(),
         name='task_list'),
+    url(
+        r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/(?P<task_list_pk>\d+)/archive/$',  # NOQA
+        TaskListArchiveView.as_view(),
+        name='task_list_archive'),
     url(
         r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/(?P<task_list_pk>\d+)/create/$',  # NOQA
         TaskCreateView.as_view(),
         name='task_create'),
+    url(r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/search/$',
+        TaskSearchView.as_view(),
+        name='task_search'),
+    url(
+        r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/tasks/toggle/$',
+        TaskBulkDoneToggleView.as_view(),
+        name='task_bulk_toggle'),
     url(
         r'^ctype/(?P<ctype_pk>\d+)/object/(?P<obj_pk>\d+)/task/(?P<pk>\d+)/toggle/$',  # NOQA
         TaskDoneToggleView.as_view(),
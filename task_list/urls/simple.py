@@ -2,14 +2,17 @@
 from django.conf.urls.defaults import patterns, url
 
 from ..views import (
+    TaskBulkDoneToggleView,
     TaskCreateView,
     TaskDeleteView,
     TaskDoneToggleView,
+    TaskListArchiveView,
     TaskListCreateView,
     TaskListDeleteView,
     TaskListListView,
     TaskListUpdateView,
     TaskListView,
+    TaskSearchView,
     TaskUpdateView,
     TemplateDeleteView,
     TemplateListView,
@@ -40,8 +43,15 @@ urlpatterns = patterns(
     # task urls
     url(r'^(?P<task_list_pk>\d+)/$', TaskListView.as_view(),
         name='task_list'),
+    url(r'^(?P<task_list_pk>\d+)/archive/$', TaskListArchiveView.as_view(),
+        name='task_list_archive'),
     url(r'^(?P<task_list_pk>\d+)/create/$', TaskCreateView.as_view(),
         name='task_create'),
+    url(r'^search/$', TaskSearchView.as_view(),
+        name='task_search'),
+    url(r'^tasks/toggle/$',
+        TaskBulkDoneToggleView.as_view(),
+        name='task_bulk_toggle'),
     url(r'^task/(?P<pk>\d+)/toggle/$',
         TaskDoneToggleView.as_view(),
         name='task_toggle'),
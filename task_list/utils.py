@@ -0,0 +1,235 @@
+"""Utilities for the ``task_list`` app."""
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.urlresolvers import (
+    NoReverseMatch,
+    get_script_prefix,
+    get_urlconf,
+    reverse,
+)
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models.signals import m2m_changed
+
+from . import app_settings
+
+
+# numbers, that will hardly ever be part of a URL, so that they can be
+# replaced in a reversed URL
+URL_PLACEHOLDER_BASE = 314159265358000
+
+# the seconds, that a transaction may take to commit its changes
+UNCOMMITTED_TIMEOUT = 10
+
+_url_formats = {}
+
+
+def cached_reverse(url_name, kwargs):
+    """
+    Returns the same URL as ``reverse(url_name, kwargs=kwargs)``.
+
+    The URL is only resolved once for every url name and set of kwarg names.
+    After that, only the values are put into the cached URL. This only works
+    for numeric values like the pks used by this app, all other values fall
+    back to ``reverse``.
+
+    """
+    if not all([unicode(value).isdigit() for value in kwargs.values()]):
+        return reverse(url_name, kwargs=kwargs)
+    key = (url_name, tuple(sorted(kwargs)),
+           get_urlconf() or settings.ROOT_URLCONF, get_script_prefix())
+    try:
+        url_format = _url_formats[key]
+    except KeyError:
+        url_format = _url_formats[key] = get_url_format(url_name, key[1])
+    if url_format is None:
+        return reverse(url_name, kwargs=kwargs)
+    return url_format.format(**kwargs)
+
+
+def get_url_format(url_name, kwarg_names):
+    """
+    Returns the reversed URL with format fields for the given kwarg names or
+    None, if the URL cannot be reversed with numeric placeholders.
+
+    """
+    placeholders = dict([
+        (name, str(URL_PLACEHOLDER_BASE + index))
+        for index, name in enumerate(kwarg_names)])
+    try:
+        url = reverse(url_name, kwargs=placeholders)
+    except NoReverseMatch:
+        return None
+    url_format = url.replace('{', '{{').replace('}', '}}')
+    for name, placeholder in placeholders.items():
+        url_format = url_format.replace(placeholder, '{%s}' % name)
+    return url_format
+
+
+def get_accessible_task_lists_cache_key(user_pk):
+    """Returns the cache key for the task list ids a user can access."""
+    return 'task_list_accessible_{0}'.format(user_pk)
+
+
+def get_cached_accessible_task_lists(user_pk):
+    """Returns the cached set of accessible task list ids or None."""
+    task_list_pks = cache.get(get_accessible_task_lists_cache_key(user_pk))
+    if isinstance(task_list_pks, set):
+        return task_list_pks
+    return None
+
+
+def set_cached_accessible_task_lists(user_pk, task_list_pks):
+    """
+    Caches the set of task list ids the user can access, unless they were
+    invalidated recently.
+
+    """
+    cache.add(get_accessible_task_lists_cache_key(user_pk),
+              set(task_list_pks), app_settings.ACCESS_CACHE_TIMEOUT)
+
+
+def invalidate_accessible_task_lists(user_pks):
+    """
+    Replaces the cached task list ids of the given users with a marker.
+
+    The signals, that call this, can run inside a transaction, that is not
+    committed yet. A request, that reads the memberships meanwhile, would
+    cache the old ones again, so the marker keeps the ids from being cached
+    for ``TASK_LIST_ACCESS_CACHE_TIMEOUT`` seconds instead.
+
+    """
+    cache.set_many(dict([
+        (get_accessible_task_lists_cache_key(user_pk), 'invalidated')
+        for user_pk in user_pks]), app_settings.ACCESS_CACHE_TIMEOUT)
+
+
+def get_generation(key):
+    """
+    Returns the current value of the generation counter with the given key.
+
+    A generation is part of the keys of cached values, so bumping it
+    invalidates all of them at once. New counters start at the current time,
+    so that an evicted counter never repeats an old value.
+
+    """
+    generation = cache.get(key)
+    if generation is None:
+        generation = int(time.time() * 1000)
+        cache.set(key, generation, app_settings.CACHE_TIMEOUT)
+    return generation
+
+
+def bump_generation(key):
+    """Increments the generation counter with the given key."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the counter does not exist, so there is nothing to invalidate
+        pass
+
+
+def get_task_list_generation_cache_key(task_list_pk):
+    """Returns the cache key for the generation counter of a task list."""
+    return 'task_list_generation_{0}'.format(task_list_pk)
+
+
+def get_task_list_changed_cache_key(task_list_pk):
+    """Returns the cache key, that marks a recently changed task list."""
+    return 'task_list_changed_{0}'.format(task_list_pk)
+
+
+def get_task_list_generation(task_list_pk):
+    """Returns the generation of the cached fragments of a task list."""
+    return get_generation(get_task_list_generation_cache_key(task_list_pk))
+
+
+def get_task_list_cache_generation(task_list_pk):
+    """
+    Returns the generation, that the fragments of a task list can be cached
+    for, or None, if the list was changed in the last
+    ``UNCOMMITTED_TIMEOUT`` seconds.
+
+    """
+    if cache.get(get_task_list_changed_cache_key(task_list_pk)):
+        return None
+    return get_task_list_generation(task_list_pk)
+
+
+def bump_task_list_generation(task_list_pks):
+    """
+    Invalidates all cached fragments of the given task lists.
+
+    The changes might not be committed yet, so the lists are marked as
+    changed for ``UNCOMMITTED_TIMEOUT`` seconds, in which their fragments are
+    not cached for the new generation.
+
+    """
+    task_list_pks = list(task_list_pks)
+    for task_list_pk in task_list_pks:
+        bump_generation(get_task_list_generation_cache_key(task_list_pk))
+    cache.set_many(dict([
+        (get_task_list_changed_cache_key(task_list_pk), True)
+        for task_list_pk in task_list_pks]), UNCOMMITTED_TIMEOUT)
+
+
+def stream_json_list(items):
+    """
+    Yields the given items as chunks of a JSON array.
+
+    The items are serialized one by one, so that a queryset can be streamed
+    with ``.iterator()`` without holding all of its rows in memory.
+
+    """
+    yield '['
+    for index, item in enumerate(items):
+        yield '{0}{1}'.format(
+            ',' if index else '', json.dumps(item, cls=DjangoJSONEncoder))
+    yield ']'
+
+
+def add_m2m_if_missing(instance, field_name, obj):
+    """
+    Adds ``obj`` to a many to many field of the instance and returns True, if
+    it was not related to it before.
+
+    Unlike ``add()``, which selects the existing rows first, this runs one
+    ``INSERT ... SELECT ... WHERE NOT EXISTS`` on the through table. Only the
+    ``post_add`` signal is sent and only, if a row was inserted. If a
+    concurrent request inserts the same row first, the unique constraint of
+    the through table fails and the object counts as related already.
+
+    """
+    field = instance._meta.get_field(field_name)
+    through = field.rel.through
+    using = router.db_for_write(through, instance=instance)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    source, target = field.m2m_column_name(), field.m2m_reverse_name()
+    cursor = connection.cursor()
+    sid = transaction.savepoint(using=using)
+    try:
+        cursor.execute(
+            'INSERT INTO {0} ({1}, {2}) SELECT %s, %s{3} WHERE NOT EXISTS ('
+            'SELECT 1 FROM {0} WHERE {1} = %s AND {2} = %s)'.format(
+                qn(field.m2m_db_table()), qn(source), qn(target),
+                ' FROM DUAL' if connection.vendor in ('mysql', 'oracle')
+                else ''),
+            [instance.pk, obj.pk] * 2)
+    except IntegrityError:
+        # a concurrent request has inserted the same row after our check
+        transaction.savepoint_rollback(sid, using=using)
+        added = False
+    else:
+        transaction.savepoint_commit(sid, using=using)
+        added = cursor.rowcount > 0
+    transaction.commit_unless_managed(using=using)
+    if added:
+        m2m_changed.send(
+            sender=through, action='post_add', instance=instance,
+            reverse=False, model=field.rel.to, pk_set=set([obj.pk]),
+            using=using)
+    return added
@@ -1,19 +1,35 @@
 """Views for the ``task_list`` app."""
+import json
+
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
+from django.core.paginator import InvalidPage
 from django.core.urlresolvers import reverse
-from django.http import Http404, HttpResponseRedirect
+from django.db.models import Q
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.utils.decorators import method_decorator
+from django.utils.encoding import force_text
+from django.utils.functional import SimpleLazyObject
+from django.utils.timezone import now
 from django.views.generic import (
     CreateView,
     DeleteView,
     FormView,
     ListView,
     UpdateView,
+    View,
 )
 from django.shortcuts import get_object_or_404
 
+from . import app_settings
 from .forms import (
+    TaskBulkDoneToggleForm,
     TaskCreateForm,
     TaskDoneToggleForm,
     TaskListCreateForm,
@@ -21,7 +37,12 @@ from .forms import (
     TaskUpdateForm,
     TemplateForm,
 )
-from .models import Task, TaskList
+from .instrumentation import record_time
+from .models import ArchivedTask, Task, TaskList
+from .pagination import KeysetPaginator
+from .permissions import has_object_permission
+from .search import get_search_backend
+from .utils import get_task_list_cache_generation, stream_json_list
 
 
 # ======
@@ -37,15 +58,17 @@ class LoginRequiredMixin(object):
         self.ctype_pk = kwargs.get('ctype_pk')
         self.obj_pk = kwargs.get('obj_pk')
         if self.ctype_pk:
-            try:
-                self.ctype = ContentType.objects.get_for_id(self.ctype_pk)
-            except ContentType.DoesNotExist:
-                raise Http404
-            else:
-                self.obj = self.ctype.get_object_for_this_type(pk=self.obj_pk)
-                if (not hasattr(self.obj, 'task_list_has_permission') or
-                        not self.obj.task_list_has_permission(request)):
+            with record_time(request, 'login_required_time'):
+                try:
+                    self.ctype = ContentType.objects.get_for_id(self.ctype_pk)
+                except ContentType.DoesNotExist:
                     raise Http404
+                if not has_object_permission(
+                        request, self.ctype, self.obj_pk):
+                    raise Http404
+            # the object is only loaded, if someone really needs it
+            self.obj = SimpleLazyObject(
+                lambda: self.ctype.get_object_for_this_type(pk=self.obj_pk))
         return super(LoginRequiredMixin, self).dispatch(
             request, *args, **kwargs)
 
@@ -100,15 +123,16 @@ class PermissionMixin(LoginRequiredMixin):
     @method_decorator(login_required)
     def dispatch(self, request, *args, **kwargs):
         self.kwargs = kwargs
-        self.object = self.get_object()
-        if isinstance(self.object, Task):
-            self.task_list = self.object.task_list
-        else:
-            self.task_list = self.object
-        # since we allow to only add users to a task, that are on the task
-        # list, the following check will also be secure for tasks
-        if not request.user in self.task_list.users.all():
-            raise Http404
+        with record_time(request, 'permission_time'):
+            self.object = self.get_object()
+            if isinstance(self.object, Task):
+                self.task_list = self.object.task_list
+            else:
+                self.task_list = self.object
+            # since we allow to only add users to a task, that are on the task
+            # list, the following check will also be secure for tasks
+            if not self.task_list.has_member(request.user):
+                raise Http404
         return super(PermissionMixin, self).dispatch(
             request, *args, **kwargs)
 
@@ -118,10 +142,52 @@ class PermissionMixin(LoginRequiredMixin):
         return ctx
 
 
+class TaskListsMixin(object):
+    """Mixin to get the task lists of the current user and content object."""
+    def get_task_lists(self):
+        queryset = TaskList.objects.filter(
+            users=self.request.user, is_template=False)
+        # the content object is copied to the list itself, so we don't need
+        # to join the Parent table
+        if self.ctype_pk:
+            return queryset.filter(
+                content_type=self.ctype, object_id=self.obj_pk)
+        return queryset.filter(object_id=None)
+
+
 # =====
 # Views
 # =====
 
+class TaskBulkDoneToggleView(LoginRequiredMixin, FormView):
+    """A view to mark many tasks as done or undone at once."""
+    form_class = TaskBulkDoneToggleForm
+    http_method_names = ['post']
+
+    def form_invalid(self, form):
+        """
+        Like in the ``TaskDoneToggleView``, we never want to get stuck on this
+        view, so we redirect back to the success url.
+
+        """
+        return HttpResponseRedirect(self.get_success_url())
+
+    def form_valid(self, form):
+        form.save()
+        return HttpResponseRedirect(self.get_success_url())
+
+    def get_form_kwargs(self):
+        kwargs = super(TaskBulkDoneToggleView, self).get_form_kwargs()
+        kwargs.update({'user': self.request.user})
+        return kwargs
+
+    def get_success_url(self):
+        next = self.request.POST.get('next')
+        if next:
+            return next
+        return reverse('task_list_list')
+
+
 class TaskCreateView(PermissionMixin, TaskCRUDViewMixin, CreateView):
     """View to create new tasks."""
     form_class = TaskCreateForm
@@ -162,6 +228,11 @@ class TaskDoneToggleView(PermissionMixin, FormView):
         form.save()
         return HttpResponseRedirect(self.get_success_url())
 
+    def get_form_kwargs(self):
+        kwargs = super(TaskDoneToggleView, self).get_form_kwargs()
+        kwargs.update({'task_list': self.task_list})
+        return kwargs
+
     def get_object(self, querset=None):
         return get_object_or_404(Task, pk=self.kwargs.get('pk'))
 
@@ -198,21 +269,51 @@ class TaskListDeleteView(PermissionMixin, DeleteView):
         return reverse('task_list_list', kwargs=kwargs)
 
 
-class TaskListListView(LoginRequiredMixin, ListView):
-    """View to list all TaskList objects for the current user."""
+class TaskListListView(LoginRequiredMixin, TaskListsMixin, ListView):
+    """
+    View to list all TaskList objects for the current user.
+
+    Besides its task counters, each list gets an ``overdue_count``.
+
+    """
     model = TaskList
     template_name = 'task_list/task_list_list.html'
 
     def get_queryset(self):
-        ctype = None
-        if self.ctype_pk:
-            try:
-                ctype = ContentType.objects.get_for_id(self.ctype_pk)
-            except ContentType.DoesNotExist:
-                pass
-        return TaskList.objects.filter(
-            users__pk=self.request.user.pk, is_template=False,
-            parent__content_type=ctype, parent__object_id=self.obj_pk)
+        return self.get_task_lists()
+
+    def get_overdue_counts(self):
+        """Returns the number of overdue tasks of each list by its id."""
+        return TaskList.objects.get_overdue_counts(
+            self.get_queryset(), now().date())
+
+    def get_context_data(self, **kwargs):
+        ctx = super(TaskListListView, self).get_context_data(**kwargs)
+        overdue_counts = self.get_overdue_counts()
+        for task_list in ctx['object_list']:
+            task_list.overdue_count = overdue_counts.get(task_list.pk, 0)
+        return ctx
+
+
+class TaskListListAPIView(TaskListListView):
+    """Returns all TaskList objects of the current user as a JSON array."""
+    fields = ('id', 'title', 'task_count', 'done_count')
+
+    def iter_task_lists(self):
+        """Yields the lists as dicts including their open and overdue tasks."""
+        overdue_counts = self.get_overdue_counts()
+        for task_list in self.get_queryset().values(*self.fields).iterator():
+            open_count = task_list['task_count'] - task_list['done_count']
+            task_list.update({
+                'open_count': open_count,
+                'overdue_count': overdue_counts.get(task_list['id'], 0),
+            })
+            yield task_list
+
+    def get(self, request, *args, **kwargs):
+        return StreamingHttpResponse(
+            stream_json_list(self.iter_task_lists()),
+            content_type='application/json')
 
 
 class TaskListUpdateView(TaskListCRUDViewMixin, PermissionMixin, UpdateView):
@@ -232,26 +333,118 @@ class TaskListView(LoginRequiredMixin, ListView):
     """
     A view that lists all tasks of a task list and allows to toggle is_done.
 
+    The tasks are paginated by the ``after`` and ``before`` cursors given in
+    the query string.
+
     """
     model = Task
+    paginate_by = app_settings.PAGINATE_BY
+    pagination_ordering = ['due_date', 'priority', 'title', 'pk']
     template_name = 'task_list/task_list.html'
 
     @method_decorator(login_required)
     def dispatch(self, request, *args, **kwargs):
-        self.task_list = get_object_or_404(TaskList, pk=kwargs.get(
-            'task_list_pk'))
-        if not request.user in self.task_list.users.all() or (
-                self.task_list.is_template):
-            raise Http404
+        with record_time(request, 'permission_time'):
+            self.task_list = get_object_or_404(TaskList, pk=kwargs.get(
+                'task_list_pk'))
+            if (self.task_list.is_template or
+                    not self.task_list.has_member(request.user)):
+                raise Http404
         return super(TaskListView, self).dispatch(
             request, *args, **kwargs)
 
     def get_queryset(self):
         return Task.objects.filter(task_list=self.task_list)
 
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size,
+                                    self.pagination_ordering)
+        try:
+            page = paginator.page(after=self.request.GET.get('after'),
+                                  before=self.request.GET.get('before'))
+        except InvalidPage:
+            raise Http404
+        return (paginator, page, page.object_list, page.has_other_pages())
+
     def get_context_data(self, **kwargs):
         ctx = super(TaskListView, self).get_context_data(**kwargs)
-        ctx.update({'task_list': self.task_list})
+        ctx.update({
+            'task_list': self.task_list,
+            'task_list_generation': get_task_list_cache_generation(
+                self.task_list.pk),
+            'cache_timeout': app_settings.CACHE_TIMEOUT,
+            'page_key': self.get_page_key(ctx.get('page_obj')),
+        })
+        return ctx
+
+    def get_page_key(self, page):
+        """
+        Returns the key, that the cached rows of the page are stored by.
+
+        It holds the content object of the urls in the rows and the ids of
+        the first and the last task of the page. Unlike the query string, the
+        ids can only take the values of existing tasks, so that clients
+        cannot fill the cache with arbitrary keys.
+
+        """
+        task_pks = ['', '']
+        if page and page.object_list:
+            task_pks = [page.object_list[0].pk, page.object_list[-1].pk]
+        return '{0}-{1}-{2}-{3}'.format(
+            self.ctype_pk or '', self.obj_pk or '', *task_pks)
+
+
+class TaskListArchiveView(TaskListView):
+    """
+    A view that lists the archived tasks of a task list.
+
+    The tasks are paginated like the tasks of ``TaskListView``.
+
+    """
+    model = ArchivedTask
+    template_name = 'task_list/task_list_archive.html'
+
+    def get_queryset(self):
+        return ArchivedTask.objects.filter(task_list=self.task_list)
+
+
+class TaskListAPIView(TaskListView):
+    """Returns all tasks of a task list as a JSON array."""
+    fields = ('id', 'title', 'description', 'category', 'due_date',
+              'is_done', 'priority')
+
+    def get(self, request, *args, **kwargs):
+        tasks = self.get_queryset().values(*self.fields).iterator()
+        return StreamingHttpResponse(
+            stream_json_list(tasks), content_type='application/json')
+
+
+class TaskSearchView(LoginRequiredMixin, TaskListsMixin, ListView):
+    """
+    A view to search the tasks of all lists of the current user.
+
+    The search term is given by the ``q`` parameter of the query string and
+    searched by the backend set in ``TASK_LIST_SEARCH_BACKEND``.
+
+    """
+    model = Task
+    paginate_by = app_settings.PAGINATE_BY
+    template_name = 'task_list/task_search.html'
+
+    def get_search_term(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        search_term = self.get_search_term()
+        if not search_term:
+            return Task.objects.none()
+        queryset = Task.objects.filter(
+            task_list__in=self.get_task_lists()).select_related('task_list')
+        return get_search_backend().search(queryset, search_term)
+
+    def get_context_data(self, **kwargs):
+        ctx = super(TaskSearchView, self).get_context_data(**kwargs)
+        ctx.update({'search_term': self.get_search_term()})
         return ctx
 
 
@@ -283,8 +476,8 @@ class TemplateListView(LoginRequiredMixin, ListView):
     template_name = 'task_list/template_list.html'
 
     def get_queryset(self):
-        return TaskList.objects.filter(users__pk=self.request.user.pk,
-                                       is_template=True)
+        return TaskList.objects.filter(
+            users=self.request.user, is_template=True)
 
 
 class TemplateUpdateView(TaskListCRUDViewMixin, PermissionMixin, UpdateView):
@@ -293,6 +486,14 @@ class TemplateUpdateView(TaskListCRUDViewMixin, PermissionMixin, UpdateView):
     model = TaskList
     template_name = 'task_list/template_form.html'
 
+    def form_valid(self, form):
+        self.object = form.save()
+        if self.object is None:
+            # another template got the same title after the form was
+            # validated
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
     def get_context_data(self, **kwargs):
         ctx = super(TemplateUpdateView, self).get_context_data(**kwargs)
         next = self.request.GET.get('next') or self.request.POST.get('next')
@@ -305,3 +506,54 @@ class TemplateUpdateView(TaskListCRUDViewMixin, PermissionMixin, UpdateView):
         if next:
             return next
         return reverse('template_update', kwargs={'pk': self.object.pk})
+
+
+class UserAutocompleteView(LoginRequiredMixin, View):
+    """
+    Returns the users, whose username starts with the ``q`` parameter, as
+    JSON object with the keys ``results`` and ``next``.
+
+    At most ``TASK_LIST_AUTOCOMPLETE_LIMIT`` users, or less if given by the
+    ``limit`` parameter, are returned at once. The next page is fetched by
+    passing the ``next`` value as ``after`` parameter. If a ``task_list_pk``
+    is given, only the users of that list are searched. Otherwise the users,
+    who share a list with the current user, are searched and any other user
+    is only found by the full username, so that new members can be added to
+    a list.
+
+    """
+    def get_search_term(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        task_list_pk = self.kwargs.get('task_list_pk')
+        if task_list_pk is None:
+            # the usernames of other users must not be enumerable
+            return User.objects.filter(
+                Q(task_lists__users=self.request.user) |
+                Q(username__iexact=self.get_search_term())).distinct()
+        task_list = get_object_or_404(TaskList, pk=task_list_pk)
+        if not task_list.has_member(self.request.user):
+            raise Http404
+        return User.objects.filter(task_lists=task_list)
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit'))
+        except (TypeError, ValueError):
+            return app_settings.AUTOCOMPLETE_LIMIT
+        return max(1, min(limit, app_settings.AUTOCOMPLETE_LIMIT))
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset().filter(
+            username__istartswith=self.get_search_term())
+        paginator = KeysetPaginator(queryset, self.get_limit(), ['username'])
+        try:
+            page = paginator.page(after=request.GET.get('after'))
+        except InvalidPage:
+            raise Http404
+        return HttpResponse(json.dumps({
+            'results': [{'id': user.pk, 'text': force_text(user)}
+                        for user in page],
+            'next': page.next_cursor if page.has_next() else None,
+        }), content_type='application/json')
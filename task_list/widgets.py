@@ -0,0 +1,38 @@
+"""Widgets for the ``task_list`` app."""
+from django import forms
+from django.contrib.auth.models import User
+from django.utils.encoding import force_text
+
+
+class UserAutocompleteWidget(forms.SelectMultiple):
+    """
+    Renders a multiple select, that only contains the selected users.
+
+    Further users are loaded by ``task_list/js/user_autocomplete.js`` from the
+    ``UserAutocompleteView`` at the given url, so that the choices of the
+    field are never rendered as a whole.
+
+    :url: The url of the autocomplete view. Can be lazy.
+
+    """
+    class Media:
+        js = ('task_list/js/user_autocomplete.js', )
+
+    def __init__(self, url, attrs=None):
+        super(UserAutocompleteWidget, self).__init__(attrs)
+        self.url = url
+
+    def get_selected_choices(self, value):
+        """Returns the choices of the given user ids in one query."""
+        pks = [pk for pk in value or [] if force_text(pk).isdigit()]
+        if not pks:
+            return []
+        return [(user.pk, force_text(user)) for user in User.objects.filter(
+            pk__in=pks).order_by('username')]
+
+    def render(self, name, value, attrs=None, choices=()):
+        # the widget is copied for every form, so we can replace the choices
+        # of the field with the selected ones
+        self.choices = self.get_selected_choices(value)
+        attrs = dict(attrs or {}, **{'data-autocomplete-url': self.url})
+        return super(UserAutocompleteWidget, self).render(name, value, attrs)